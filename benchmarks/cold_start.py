@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Cold start of BlogService: scanning the content tree vs loading a snapshot.
+
+Generates a synthetic corpus, builds a snapshot of it, then times a fresh
+interpreter loading the content three ways: a full scan, the snapshot,
+and a stale snapshot after one post was edited.
+
+    python benchmarks/cold_start.py --posts 2000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from corpus import generate_corpus
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+LOAD = '''
+import time
+started = time.perf_counter()
+from app.services.blog_service import BlogService
+blog_service = BlogService()
+blog_service.load()
+print((time.perf_counter() - started) * 1000)
+'''
+
+def timed_load(content_dir: str, snapshot: str, repeat: int) -> float:
+    """Best wall time in ms of loading the content in a new interpreter"""
+    env = dict(os.environ, CONTENT_DIR=content_dir, CONTENT_SNAPSHOT=snapshot)
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', LOAD],
+            cwd=os.path.join(ROOT, 'src'), env=env, check=True, capture_output=True, text=True
+        )
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return min(times)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, 'content')
+        snapshot = os.path.join(tmp, 'content.snapshot')
+        generate_corpus(content_dir, args.posts)
+        subprocess.run(
+            [sys.executable, 'build_snapshot.py', '--out', snapshot],
+            cwd=os.path.join(ROOT, 'src'), env=dict(os.environ, CONTENT_DIR=content_dir),
+            check=True, capture_output=True
+        )
+        print(f'{args.posts} posts, snapshot {os.path.getsize(snapshot) / 1024 / 1024:.1f} MiB')
+
+        print(f'scan            {timed_load(content_dir, "", args.repeat):8.1f}ms')
+        print(f'snapshot        {timed_load(content_dir, snapshot, args.repeat):8.1f}ms')
+        edited = os.path.join(content_dir, 'posts', 'post-00000.md')
+        os.utime(edited, ns=(time.time_ns(), time.time_ns()))
+        print(f'stale snapshot  {timed_load(content_dir, snapshot, args.repeat):8.1f}ms')
+
+if __name__ == '__main__':
+    main()
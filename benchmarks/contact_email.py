@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Contact form latency and delivery against a local stand-in SMTP server.
+
+Starts a minimal SMTP server in-process that answers every command after
+--smtp-delay seconds and rejects the first --fail-first messages with a
+451, then runs the app with uvicorn pointed at it and submits the contact
+form. The form should return in milliseconds regardless of the SMTP delay,
+every message should arrive once the retries are through, and a single
+SMTP connection should carry all of them.
+
+    python benchmarks/contact_email.py --smtp-delay 0.5 --fail-first 2
+"""
+import argparse
+import http.client
+import os
+import socketserver
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from health_latency import ROOT, free_port, percentile, wait_for_server
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    """Just enough SMTP for smtplib: EHLO, AUTH PLAIN, MAIL, RCPT, DATA, NOOP, QUIT"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, delay: float, fail_first: int):
+        super().__init__(('127.0.0.1', 0), StandInSMTPHandler)
+        self.delay = delay
+        self.fail_first = fail_first
+        self.connections = 0
+        self.messages: list[bytes] = []
+        self.lock = threading.Lock()
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        time.sleep(self.server.delay)
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self) -> None:
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply('220 stand-in ESMTP')
+        while line := self.rfile.readline():
+            command = line.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250-stand-in')
+                self.reply('250 AUTH PLAIN')
+            elif command.startswith('AUTH'):
+                self.reply('235 Authentication successful')
+            elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = b''
+                while (chunk := self.rfile.readline()) not in (b'.\r\n', b''):
+                    data += chunk
+                with self.server.lock:
+                    rejected = self.server.fail_first > 0
+                    if rejected:
+                        self.server.fail_first -= 1
+                    else:
+                        self.server.messages.append(data)
+                self.reply('451 Try again later' if rejected else '250 Queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+def submit(port: int, index: int) -> float:
+    body = urlencode({'name': f'Bench {index}', 'email': 'bench@example.com', 'message': f'Message {index}'})
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    start = time.perf_counter()
+    conn.request('POST', '/contact', body, {'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    response.read()
+    elapsed = (time.perf_counter() - start) * 1000
+    if response.status != 200:
+        raise RuntimeError(f'POST /contact returned {response.status}')
+    return elapsed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', default='app.main:app')
+    parser.add_argument('--messages', type=int, default=20)
+    parser.add_argument('--smtp-delay', type=float, default=0.2, help='seconds before every SMTP reply')
+    parser.add_argument('--fail-first', type=int, default=1, help='messages to reject with a 451 first')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    args = parser.parse_args()
+
+    smtp = StandInSMTPServer(args.smtp_delay, args.fail_first)
+    threading.Thread(target=smtp.serve_forever, daemon=True).start()
+
+    port = free_port()
+    env = dict(
+        os.environ,
+        TO='inbox@example.com',
+        SMTP_USERNAME='site@example.com',
+        SMTP_PASSWORD='secret',
+        SMTP_HOST='127.0.0.1',
+        SMTP_PORT=str(smtp.server_address[1]),
+        SMTP_STARTTLS='0',
+        EMAIL_SPOOL_DIR='',
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', args.app, '--app-dir', 'src', '--port', str(port), '--log-level', 'warning'],
+        cwd=ROOT,
+        env=env,
+    )
+    try:
+        wait_for_server(port)
+        started = time.perf_counter()
+        samples = [submit(port, i) for i in range(args.messages)]
+        print(
+            f'POST /contact p50={statistics.median(samples):7.2f}ms '
+            f'p99={percentile(samples, 0.99):7.2f}ms max={max(samples):7.2f}ms'
+        )
+
+        deadline = time.monotonic() + args.timeout
+        while len(smtp.messages) < args.messages and time.monotonic() < deadline:
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        print(f'Delivered {len(smtp.messages)}/{args.messages} messages in {elapsed:.1f}s over {smtp.connections} SMTP connections')
+    finally:
+        server.terminate()
+        server.wait()
+        smtp.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Synthetic content trees for benchmarks.
+
+Posts look like the real ones: YAML front matter, a few paragraphs with
+links and inline code, headings and a fenced code block, spread over a
+handful of series.
+"""
+import os
+import random
+from datetime import date, timedelta
+
+WORDS = (
+    'site blog post series python fastapi render cache index template markdown content '
+    'server worker request response latency memory startup snapshot search token page '
+    'build static asset image font icon header footer theme layout processor kernel '
+    'compiler parser lexer queue thread socket fork signal metric profile benchmark'
+).split()
+TAGS = ['tech', 'python', 'web-development', 'hardware', 'os', 'notes', 'projects', 'math']
+LANGUAGES = ['python', 'c', 'rust', 'yaml', 'bash']
+
+def sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(8, 18))
+    if rng.random() < 0.3:
+        words[rng.randrange(len(words))] = f'`{rng.choice(WORDS)}()`'
+    if rng.random() < 0.2:
+        i = rng.randrange(len(words))
+        words[i] = f'[{words[i]}](https://example.com/{words[i]})'
+    return ' '.join(words).capitalize() + '.'
+
+def post_body(rng: random.Random, paragraphs: int, code_blocks: int = 1) -> str:
+    parts = []
+    code_at = {paragraphs * (k + 1) // (code_blocks + 1) for k in range(code_blocks)}
+    for i in range(paragraphs):
+        if i and i % 3 == 0:
+            parts.append(f'## {sentence(rng)[:-1]}')
+        parts.append(' '.join(sentence(rng) for _ in range(rng.randint(3, 6))))
+        if i in code_at:
+            lang = rng.choice(LANGUAGES)
+            code = '\n'.join(f'{rng.choice(WORDS)} = {rng.choice(WORDS)}({i})' for i in range(rng.randint(3, 10)))
+            parts.append(f'```{lang}\n{code}\n```')
+    return '\n\n'.join(parts) + '\n'
+
+def generate_corpus(
+    directory: str,
+    posts: int,
+    series: int = 10,
+    paragraphs: int = 12,
+    seed: int = 1,
+    tags: int = len(TAGS),
+    code_blocks: int = 1
+) -> None:
+    """Write `posts` posts and `series` series under directory/posts and directory/series"""
+    rng = random.Random(seed)
+    tag_pool = TAGS + [f'topic-{i:03d}' for i in range(tags - len(TAGS))]
+    os.makedirs(os.path.join(directory, 'posts'), exist_ok=True)
+    os.makedirs(os.path.join(directory, 'series'), exist_ok=True)
+    start = date(2020, 1, 1)
+    slugs = []
+    for i in range(posts):
+        slug = f'post-{i:05d}'
+        slugs.append(slug)
+        created = start + timedelta(days=i % 2000)
+        tags = ', '.join(f'"{tag}"' for tag in rng.sample(tag_pool, rng.randint(1, 3)))
+        with open(os.path.join(directory, 'posts', f'{slug}.md'), 'w', encoding='utf-8') as f:
+            f.write(
+                '---\n\n'
+                f'slug: "{slug}"\n'
+                f'file: "{slug}.md"\n'
+                f'title: "{sentence(rng)[:60]}"\n'
+                'authors: ["Bench Author"]\n'
+                f'created: "{created.isoformat()}"\n'
+                f'description: "{sentence(rng)[:120]}"\n'
+                f'tags: [{tags}]\n'
+                f'draft: {"true" if i % 50 == 49 else "false"}\n'
+                f'featured: {"true" if i % 97 == 0 else "false"}\n'
+                '\n---\n\n'
+            )
+            f.write(post_body(rng, paragraphs, code_blocks))
+    for i in range(series):
+        members = slugs[i::max(series, 1)][:20]
+        with open(os.path.join(directory, 'series', f'series-{i:03d}.yaml'), 'w', encoding='utf-8') as f:
+            f.write(
+                f'slug: series-{i:03d}\n'
+                f'title: "Series {i}"\n'
+                f'description: "{sentence(rng)}"\n'
+                'authors: ["Bench Author"]\n'
+                f'created: "{start.isoformat()}"\n'
+                'status: ""\n'
+                'cover_image: ""\n'
+                'posts:\n'
+            )
+            for order, slug in enumerate(members, 1):
+                f.write(f'  - slug: "{slug}"\n    order: {order}\n')
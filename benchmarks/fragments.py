@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Per-request cost of the home/about/contact Markdown fragments.
+
+Compares reading and converting a fragment on every request (the old
+behaviour) with FragmentService lookups, and puts both next to a full
+in-process GET of the page with the response cache disabled, which is now
+dominated by the Jinja render.
+
+    python benchmarks/fragments.py
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import sys
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+os.chdir(ROOT)
+os.environ['RESPONSE_CACHE_ENTRIES'] = '0'
+
+from markdown import markdown
+from app.services.fragment_service import FragmentService, HOME_DIR
+from app.static_export import fetch
+
+PAGES = {'hero': '/', 'about': '/about', 'contact': '/contact'}
+
+def legacy_render(name: str) -> str:
+    with open(os.path.join(HOME_DIR, f'{name}.md'), 'r', encoding='utf-8') as f:
+        content = f.read()
+    return markdown(content, extensions=['fenced_code', 'codehilite', 'tables'])
+
+def best_of(func, number: int) -> float:
+    """Best per-call time in microseconds over five runs"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', default='app.main:app')
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+
+    module_name, attr = args.app.split(':')
+    app = getattr(importlib.import_module(module_name), attr)
+    fragments = FragmentService()
+    fragments.load()
+    loop = asyncio.new_event_loop()
+
+    print(f'{"fragment":<10}{"legacy":>12}{"cached":>12}{"full GET":>12}')
+    for name, path in PAGES.items():
+        legacy = best_of(lambda: legacy_render(name), args.number)
+        cached = best_of(lambda: fragments.get(name), args.number)
+        page = best_of(lambda: loop.run_until_complete(fetch(app, path, 'http://localhost')), args.number)
+        print(f'{name:<10}{legacy:>10.1f}us{cached:>10.2f}us{page:>10.1f}us')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Front matter parsing over a synthetic corpus (10k posts by default).
+
+Compares the old parser (readlines of the whole file, pure-Python
+SafeLoader) with the streaming reader for the three ways posts are read:
+metadata only, metadata plus body (content load, which also feeds the
+search index) and body only (rendering).
+
+    python benchmarks/frontmatter.py --posts 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import yaml
+from corpus import generate_corpus
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from app.services.blog_service import YAML_LOADER, parse_frontmatter, read_body, read_frontmatter
+
+def legacy_parse_frontmatter(md_path):
+    with open(md_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+
+    if lines[0].strip() == '---':
+        end = next(i for i, line in enumerate(lines[1:], 1) if line.strip() == '---')
+        frontmatter = ''.join(lines[1:end])
+        body = ''.join(lines[end+1:])
+        data = yaml.safe_load(frontmatter)
+        return data, body
+    return {}, ''.join(lines)
+
+def read_meta(md_path):
+    with open(md_path, 'r', encoding='utf-8') as f:
+        return read_frontmatter(f)
+
+def timed(func, paths: list[str]) -> float:
+    started = time.perf_counter()
+    for path in paths:
+        func(path)
+    return time.perf_counter() - started
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=10_000)
+    parser.add_argument('--paragraphs', type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_corpus(tmp, args.posts, paragraphs=args.paragraphs)
+        posts_dir = os.path.join(tmp, 'posts')
+        paths = sorted(os.path.join(posts_dir, name) for name in os.listdir(posts_dir))
+        size = sum(os.path.getsize(path) for path in paths)
+        print(f'{len(paths)} posts, {size / 1024 / 1024:.1f} MiB, YAML loader {YAML_LOADER.__name__}')
+
+        # Warm the page cache so every run measures parsing, not the disk
+        timed(legacy_parse_frontmatter, paths)
+        legacy = timed(legacy_parse_frontmatter, paths)
+        rows = [
+            ('metadata only', legacy, timed(read_meta, paths)),
+            ('metadata + body', legacy, timed(parse_frontmatter, paths)),
+            ('body only', legacy, timed(read_body, paths)),
+        ]
+        print(f'{"":<18}{"legacy":>10}{"streaming":>12}{"speedup":>10}')
+        for label, old, new in rows:
+            print(f'{label:<18}{old:>9.2f}s{new:>11.2f}s{old / new:>9.1f}x')
+
+if __name__ == '__main__':
+    main()
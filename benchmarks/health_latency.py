@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Measure /health latency while post pages are under saturation.
+
+Starts the app with uvicorn in a subprocess, records /health latency while
+idle, then again while a pool of client threads hammers a post page. If
+blocking work leaks onto the event loop, the loaded p99 climbs with the
+render time of the post; with it offloaded the two stay close.
+
+    python benchmarks/health_latency.py --load-path /blog/p/my-blog
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_for_server(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('server did not start')
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+def sample_health(port: int, count: int, interval: float) -> list[float]:
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        conn.request('GET', '/health')
+        conn.getresponse().read()
+        samples.append((time.perf_counter() - start) * 1000)
+        time.sleep(interval)
+    return samples
+
+def hammer(port: int, path: str, stop: threading.Event, counter: list[int]) -> None:
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    while not stop.is_set():
+        conn.request('GET', path)
+        conn.getresponse().read()
+        counter[0] += 1
+
+def report(label: str, samples: list[float]) -> None:
+    print(
+        f'{label:<8} p50={statistics.median(samples):7.2f}ms '
+        f'p99={percentile(samples, 0.99):7.2f}ms max={max(samples):7.2f}ms'
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', default='app.main:app')
+    parser.add_argument('--load-path', default='/blog/p/my-blog')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--samples', type=int, default=300)
+    parser.add_argument('--interval', type=float, default=0.01)
+    args = parser.parse_args()
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', args.app, '--app-dir', 'src', '--port', str(port), '--log-level', 'warning'],
+        cwd=ROOT,
+    )
+    try:
+        wait_for_server(port)
+        report('idle', sample_health(port, args.samples, args.interval))
+
+        stop = threading.Event()
+        counter = [0]
+        workers = [
+            threading.Thread(target=hammer, args=(port, args.load_path, stop, counter), daemon=True)
+            for _ in range(args.clients)
+        ]
+        for worker in workers:
+            worker.start()
+        started = time.perf_counter()
+        loaded = sample_health(port, args.samples, args.interval)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+        report('loaded', loaded)
+        print(f'{args.load_path}: {counter[0] / elapsed:.1f} req/s with {args.clients} clients')
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == '__main__':
+    main()
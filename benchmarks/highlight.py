@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Re-rendering a code-heavy post after editing one paragraph.
+
+Times the Markdown conversion of a synthetic post with many code blocks
+without the highlight cache, with a warm in-memory cache after a one
+paragraph edit, and with only the on-disk store warm, as after a restart.
+
+    python benchmarks/highlight.py --blocks 30
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import timeit
+from functools import partial
+from corpus import post_body
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from app.services.highlight_cache import HighlightCache
+from app.services.markdown_pool import MarkdownPool, create_post_markdown
+
+def edit_paragraph(body: str, n: int) -> str:
+    paragraphs = body.split('\n\n')
+    paragraphs[1] = f'Edited paragraph {n}.'
+    return '\n\n'.join(paragraphs)
+
+def best_of(func, number: int) -> float:
+    """Best per-call time in milliseconds over five runs"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--blocks', type=int, default=30)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    body = post_body(random.Random(1), paragraphs=args.blocks * 2, code_blocks=args.blocks)
+    pool = MarkdownPool()
+    edits = iter(range(1_000_000))
+    print(f'{args.blocks} code blocks, {len(body) / 1024:.0f} KiB of Markdown')
+
+    uncached = best_of(lambda: pool.convert(edit_paragraph(body, next(edits))), args.number)
+    print(f'no cache        {uncached:8.2f}ms')
+
+    with tempfile.TemporaryDirectory() as store:
+        cached_pool = MarkdownPool(partial(create_post_markdown, HighlightCache(store_dir=store)))
+        cached_pool.convert(body)
+        cached = best_of(lambda: cached_pool.convert(edit_paragraph(body, next(edits))), args.number)
+        print(f'memory cache    {cached:8.2f}ms  ({uncached / cached:.1f}x)')
+
+        def restarted():
+            create_post_markdown(HighlightCache(store_dir=store)).convert(edit_paragraph(body, next(edits)))
+        disk = best_of(restarted, args.number)
+        print(f'disk store      {disk:8.2f}ms  ({uncached / disk:.1f}x)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Memory and build time of post metadata: Pydantic models vs compact records.
+
+Parses the front matter of a synthetic corpus once, then builds from it
+the validated Pydantic Post models that used to stay resident and the
+__slots__ records with interned strings and array date columns that the
+content index keeps now, measuring each with tracemalloc.
+
+    python benchmarks/memory.py --posts 20000
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from datetime import date
+from corpus import generate_corpus
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from app.models import Author, Post, PostRecord
+from app.services.blog_service import flag, names, parse_frontmatter, text
+
+def build_models(metas: list[tuple[str, dict]]) -> list[Post]:
+    return [
+        Post(
+            slug=meta.get('slug', fname[:-3]),
+            file=fname,
+            title=meta.get('title', ''),
+            authors=[Author(name=a) for a in meta.get('authors', [])],
+            created=date.fromisoformat(meta.get('created', '')),
+            updated=date.fromisoformat(meta.get('updated', meta.get('created', ''))),
+            description=meta.get('description', ''),
+            tags=meta.get('tags', []),
+            draft=meta.get('draft', False),
+            featured=meta.get('featured', False),
+            cover_image=meta.get('cover_image', ''),
+            attachments=meta.get('attachments', [])
+        )
+        for fname, meta in metas
+    ]
+
+def build_records(metas: list[tuple[str, dict]]) -> tuple[list[PostRecord], array, array]:
+    records = [
+        PostRecord(
+            row=row,
+            slug=text(meta, 'slug', fname[:-3]),
+            file=fname,
+            title=text(meta, 'title'),
+            authors=names(meta, 'authors'),
+            description=text(meta, 'description'),
+            tags=names(meta, 'tags'),
+            draft=flag(meta, 'draft'),
+            featured=flag(meta, 'featured'),
+            cover_image=text(meta, 'cover_image'),
+            attachments=names(meta, 'attachments')
+        )
+        for row, (fname, meta) in enumerate(metas)
+    ]
+    created = array('l', (date.fromisoformat(meta['created']).toordinal() for _, meta in metas))
+    updated = array('l', (date.fromisoformat(meta.get('updated', meta['created'])).toordinal() for _, meta in metas))
+    return records, created, updated
+
+def measure(build, metas: list[tuple[str, dict]]) -> tuple[int, float]:
+    """Bytes retained by the result and the fastest of three build times in ms"""
+    times = []
+    for _ in range(3):
+        gc.collect()
+        started = time.perf_counter()
+        build(metas)
+        times.append((time.perf_counter() - started) * 1000)
+    gc.collect()
+    tracemalloc.start()
+    result = build(metas)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return retained, min(times)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_corpus(tmp, args.posts, series=args.posts // 100, tags=max(8, args.posts // 50))
+        posts_dir = os.path.join(tmp, 'posts')
+        metas = [(fname, parse_frontmatter(os.path.join(posts_dir, fname))[0]) for fname in sorted(os.listdir(posts_dir))]
+
+    print(f'{args.posts} posts')
+    model_bytes, model_ms = measure(build_models, metas)
+    record_bytes, record_ms = measure(build_records, metas)
+    for label, size, ms in (('pydantic models', model_bytes, model_ms), ('compact records', record_bytes, record_ms)):
+        print(f'{label:<16}{size / 1024 / 1024:8.1f} MiB {size / args.posts:7.0f} B/post {ms:9.1f}ms')
+    print(f'{model_bytes / record_bytes:.1f}x less memory, {model_ms / record_ms:.1f}x faster to build')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite over synthetic corpora of several sizes.
+
+For every size a content tree is generated in a temporary directory and
+measured in a fresh interpreter:
+
+- BlogService load time and the memory the loaded content retains
+- render_post_body throughput with an empty render cache
+- /blog search and tag filter latency, with the response cache disabled
+- requests per second of a mixed page workload through the ASGI app
+
+Results are written as JSON; pass an earlier file to --compare to see what
+changed between commits.
+
+    python benchmarks/suite.py --sizes 200,2000,20000
+    python benchmarks/suite.py --compare build/benchmarks/<commit>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from corpus import TAGS, WORDS, generate_corpus
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RESULTS_DIR = os.path.join(ROOT, 'build', 'benchmarks')
+# Relative changes smaller than this are reported as noise
+THRESHOLD = 0.10
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+def latency(samples: list[float]) -> dict:
+    return {
+        'p50_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(percentile(samples, 0.95), 3),
+        'p99_ms': round(percentile(samples, 0.99), 3),
+    }
+
+def rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def measure(args: argparse.Namespace) -> dict:
+    """Runs in the child interpreter, with CONTENT_DIR pointing at the corpus"""
+    import gc
+    import importlib
+    import tracemalloc
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+    os.chdir(ROOT)
+    from app.services.blog_service import PAGE_SIZE, BlogService
+    from app.static_export import fetch
+
+    results = {}
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    blog_service = BlogService()
+    blog_service.load()
+    results['load_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    results['rss_delta_bytes'] = rss_bytes() - rss_before
+
+    # A second load under tracemalloc, so tracing does not skew the timing above
+    gc.collect()
+    tracemalloc.start()
+    other = BlogService()
+    other.load()
+    gc.collect()
+    results['content_bytes'] = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del other
+
+    posts = blog_service.posts[:args.render_posts]
+    started = time.perf_counter()
+    for post in posts:
+        blog_service.render_post_body(post)
+    elapsed = time.perf_counter() - started
+    results['render_posts_per_sec'] = round(len(posts) / elapsed, 1)
+
+    module_name, attr = args.app.split(':')
+    app = getattr(importlib.import_module(module_name), attr)
+    from app.dependencies import get_blog_service, get_template_service
+    blog_service = get_blog_service()
+    template_service = get_template_service()
+    rng = random.Random(args.seed)
+    loop = asyncio.new_event_loop()
+
+    def timed_get(url: str) -> float:
+        started = time.perf_counter()
+        status, _ = loop.run_until_complete(fetch(app, url, 'http://localhost'))
+        if status != 200:
+            raise RuntimeError(f'{url} returned {status}')
+        return (time.perf_counter() - started) * 1000
+
+    # Every request renders, so this is the cost of a cache miss
+    response_cache = template_service.response_cache
+    template_service.response_cache = None
+    tags = blog_service.get_tags()
+    paged_tags = [tag for tag, count in blog_service.get_tag_counts().items() if count > PAGE_SIZE] or tags
+    for name, make_url in (
+        ('search', lambda: f'/blog?search={rng.choice(WORDS)}+{rng.choice(WORDS)}'),
+        ('tag', lambda: f'/blog?tag={rng.choice(tags)}'),
+        ('tag_page_2', lambda: f'/blog?tag={rng.choice(paged_tags)}&page=2'),
+    ):
+        timed_get(make_url())
+        results[f'blog_{name}'] = latency([timed_get(make_url()) for _ in range(args.requests)])
+    template_service.response_cache = response_cache
+
+    # A mixed workload with the response cache on, as in production
+    slugs = [post.slug for post in blog_service.get_latest_posts(limit=50)]
+    urls = ['/', '/blog', '/about', '/blog?page=2'] + [f'/blog/p/{slug}' for slug in slugs]
+    urls += [f'/blog?tag={tag}' for tag in tags[:20]] + [f'/blog?search={word}' for word in WORDS[:20]]
+
+    async def client(deadline: float, counter: list[int]) -> None:
+        while time.perf_counter() < deadline:
+            status, _ = await fetch(app, rng.choice(urls), 'http://localhost')
+            if status != 200:
+                raise RuntimeError(f'request returned {status}')
+            counter[0] += 1
+
+    async def load() -> float:
+        counter = [0]
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(client(deadline, counter) for _ in range(args.concurrency)))
+        return counter[0] / (time.perf_counter() - started)
+
+    for url in urls:
+        timed_get(url)
+    results['requests_per_sec'] = round(loop.run_until_complete(load()), 1)
+    return results
+
+def run_size(args: argparse.Namespace, posts: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, 'content')
+        generate_corpus(
+            content_dir,
+            posts,
+            series=max(10, posts // 100),
+            seed=args.seed,
+            tags=max(len(TAGS), posts // 50),
+            code_blocks=3
+        )
+        shutil.copytree(os.path.join(ROOT, 'content', 'home'), os.path.join(content_dir, 'home'))
+        env = dict(os.environ, CONTENT_DIR=content_dir, CONTENT_SNAPSHOT='', PYTHONHASHSEED='0')
+        out = subprocess.run(
+            [sys.executable, __file__, '--measure', *child_args(args)],
+            env=env, capture_output=True, text=True
+        )
+        if out.returncode != 0:
+            sys.exit(f'Measuring {posts} posts failed:\n{out.stderr}')
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+def child_args(args: argparse.Namespace) -> list[str]:
+    return [
+        '--app', args.app,
+        '--seed', str(args.seed),
+        '--render-posts', str(args.render_posts),
+        '--requests', str(args.requests),
+        '--concurrency', str(args.concurrency),
+        '--duration', str(args.duration),
+    ]
+
+def git(*command: str) -> str:
+    try:
+        return subprocess.run(['git', *command], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+def flatten(results: dict, prefix: str = '') -> dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}.'))
+        else:
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+def compare(old: dict, new: dict) -> None:
+    """Print metrics that moved by more than THRESHOLD"""
+    print(f'\nCompared with {old["commit"][:12] or "unknown"} ({old["timestamp"]})')
+    old_flat = flatten(old['results'])
+    for key, value in flatten(new['results']).items():
+        before = old_flat.get(key)
+        if not before:
+            continue
+        change = (value - before) / before
+        if abs(change) < THRESHOLD:
+            continue
+        # Throughput should go up, times and sizes down
+        better = change > 0 if key.endswith('_per_sec') else change < 0
+        print(f'  {key:<32}{before:>16,.10g} -> {value:<16,.10g}{change:+7.1%}  {"better" if better else "WORSE"}')
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', default='app.main:app')
+    parser.add_argument('--sizes', default='200,2000', help='comma-separated post counts')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--render-posts', type=int, default=200, help='posts rendered for the throughput test')
+    parser.add_argument('--requests', type=int, default=200, help='requests per latency test')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds of the requests per second test')
+    parser.add_argument('--out', help=f'result file, default {os.path.relpath(RESULTS_DIR, ROOT)}/<commit>.json')
+    parser.add_argument('--compare', help='earlier result file to compare with')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args)))
+        return
+
+    commit = git('rev-parse', 'HEAD')
+    report = {
+        'commit': commit,
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('out', 'compare', 'measure')},
+        'results': {},
+    }
+    for size in (int(size) for size in args.sizes.split(',')):
+        print(f'{size} posts...', flush=True)
+        results = report['results'][str(size)] = run_size(args, size)
+        for key, value in flatten(results).items():
+            print(f'  {key:<30}{value:>16,.10g}')
+
+    out = args.out or os.path.join(RESULTS_DIR, f'{commit[:12] or "results"}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote {out}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == '__main__':
+    main()
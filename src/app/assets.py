@@ -0,0 +1,241 @@
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import posixpath
+import re
+import shutil
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:
+    font_subset = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../static'))
+BUILD_DIR = os.path.normpath(os.getenv(
+    'ASSET_BUILD_DIR',
+    os.path.join(os.path.dirname(__file__), '../../build/static')
+))
+MANIFEST_NAME = 'manifest.json'
+
+# Stylesheets linked from partial/meta.html, bundled in this order. The two
+# syntax themes stay separate because the theme switch toggles them by id.
+CSS_BUNDLE = 'css/site.css'
+CSS_BUNDLE_SOURCES = [
+    'css/style.css',
+    'css/font.css',
+    'css/post_card.css',
+    'css/series.css',
+    'css/series_card.css',
+    'css/icon.css',
+]
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.ico', '.ttf', '.otf', '.json', '.txt', '.xml'}
+# Basic Latin, Latin-1, Latin Extended-A/B, general punctuation, currency and arrows
+FONT_UNICODES = 'U+0000-024F,U+02C6-02DD,U+2000-206F,U+20AC,U+2122,U+2190-21FF'
+FONT_FORMATS = {'truetype': 'woff2', 'truetype-variations': 'woff2-variations'}
+
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+CSS_URL_RE = re.compile(r'''url\((['"]?)([^'")]+)\1\)(\s*format\((['"])([^'"]+)\4\))?''')
+
+def fingerprint(path: str, content: bytes) -> str:
+    root, ext = posixpath.splitext(path)
+    return f'{root}.{hashlib.sha256(content).hexdigest()[:12]}{ext}'
+
+def convert_font(content: bytes) -> bytes | None:
+    """Subset a TrueType font to Latin scripts and re-encode it as WOFF2"""
+    if font_subset is None or brotli is None:
+        return None
+    options = font_subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    options.name_IDs = ['*']
+    options.notdef_outline = True
+    font = font_subset.load_font(io.BytesIO(content), options)
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(unicodes=font_subset.parse_unicodes(FONT_UNICODES))
+    subsetter.subset(font)
+    out = io.BytesIO()
+    font_subset.save_font(font, out, options)
+    return out.getvalue()
+
+def rewrite_css(css: str, css_path: str, files: dict[str, str]) -> str:
+    """Point url() references at fingerprinted files, preferring WOFF2 fonts"""
+    base = posixpath.dirname(css_path)
+
+    def replace(match: re.Match) -> str:
+        url = match.group(2)
+        if ':' in url or url.startswith(('/', '#')):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(base, url))
+        fmt = match.group(5)
+        woff2 = posixpath.splitext(target)[0] + '.woff2'
+        if fmt in FONT_FORMATS and woff2 in files:
+            target, fmt = woff2, FONT_FORMATS[fmt]
+        if target not in files:
+            return match.group(0)
+        new_url = posixpath.relpath(files[target], base)
+        format_hint = f" format('{fmt}')" if fmt else ''
+        return f"url('{new_url}'){format_hint}"
+
+    return CSS_URL_RE.sub(replace, css)
+
+def build_assets(static_dir: str = STATIC_DIR, out_dir: str = BUILD_DIR) -> dict:
+    """
+    Build fingerprinted, precompressed static assets and return the manifest.
+
+    Every file is copied to a content-hashed name, TrueType fonts also get a
+    subset WOFF2 variant, stylesheets are rewritten to reference hashed
+    files and the ones linked from meta.html are concatenated into a
+    single bundle. Text assets get .gz and .br siblings when smaller.
+    """
+    files: dict[str, str] = {}
+    outputs: dict[str, bytes] = {}
+    stylesheets: dict[str, str] = {}
+    # TrueType originals only remain as a fallback once a WOFF2 exists
+    superseded: set[str] = set()
+
+    def add(logical: str, content: bytes) -> None:
+        hashed = fingerprint(logical, content)
+        files[logical] = hashed
+        outputs[hashed] = content
+
+    for root, _, names in os.walk(static_dir):
+        for name in sorted(names):
+            full_path = os.path.join(root, name)
+            logical = os.path.relpath(full_path, static_dir).replace(os.sep, '/')
+            with open(full_path, 'rb') as f:
+                content = f.read()
+            if logical.endswith('.css'):
+                # Rewritten once every other file has its final name
+                stylesheets[logical] = content.decode('utf-8')
+                continue
+            add(logical, content)
+            if logical.endswith('.ttf'):
+                woff2 = convert_font(content)
+                if woff2 is not None:
+                    add(posixpath.splitext(logical)[0] + '.woff2', woff2)
+                    superseded.add(files[logical])
+
+    rewritten = {path: rewrite_css(css, path, files) for path, css in stylesheets.items()}
+    for path, css in rewritten.items():
+        add(path, css.encode('utf-8'))
+    bundle_parts = [f'/* {path} */\n{rewritten[path]}' for path in CSS_BUNDLE_SOURCES if path in rewritten]
+    if bundle_parts:
+        add(CSS_BUNDLE, '\n'.join(bundle_parts).encode('utf-8'))
+
+    staging_dir = out_dir + '.tmp'
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    encodings: dict[str, list[str]] = {}
+    for hashed, content in outputs.items():
+        path = os.path.join(staging_dir, hashed)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        if posixpath.splitext(hashed)[1] not in COMPRESSIBLE_EXTENSIONS or hashed in superseded:
+            continue
+        variants = [('gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.insert(0, ('br', '.br', lambda data: brotli.compress(data, quality=11)))
+        for encoding, suffix, compress in variants:
+            compressed = compress(content)
+            if len(compressed) < len(content):
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+                encodings.setdefault(hashed, []).append(encoding)
+
+    manifest = {
+        'files': files,
+        'encodings': encodings,
+        'css_bundle': CSS_BUNDLE if CSS_BUNDLE in files else None,
+    }
+    with open(os.path.join(staging_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    old_dir = out_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.makedirs(os.path.dirname(out_dir), exist_ok=True)
+    os.replace(staging_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+class AssetManifest:
+    """Maps logical static paths to their fingerprinted names from the last build"""
+
+    def __init__(self, build_dir: str = BUILD_DIR):
+        self.build_dir = build_dir
+        self.files: dict[str, str] = {}
+        self.encodings: dict[str, list[str]] = {}
+        self.css_bundle: str | None = None
+        path = os.path.join(build_dir, MANIFEST_NAME)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.info('No asset manifest found, serving static files unhashed')
+            return
+        self.files = data['files']
+        self.encodings = data['encodings']
+        self.css_bundle = data['css_bundle']
+        logger.info(f'Loaded asset manifest with {len(self.files)} files from {build_dir}')
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.files)
+
+    def resolve(self, path: str) -> str:
+        return self.files.get(path, path)
+
+class AssetStaticFiles(StaticFiles):
+    """
+    StaticFiles that prefers built assets and their precompressed variants.
+
+    Fingerprinted names are served with a year-long immutable Cache-Control;
+    unhashed requests fall back to the source static directory.
+    """
+
+    def __init__(self, *, directory: str, manifest: AssetManifest, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.manifest = manifest
+        if manifest.enabled:
+            self.all_directories = [manifest.build_dir, *self.all_directories]
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        hashed = HASHED_NAME_RE.search(path) is not None
+        available = self.manifest.encodings.get(path.replace(os.sep, '/'), ())
+        accepted = Headers(scope=scope).get('accept-encoding', '')
+        accepted = {token.split(';')[0].strip() for token in accepted.split(',')}
+
+        response = None
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if encoding in available and encoding in accepted and scope['method'] in ('GET', 'HEAD'):
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result is not None:
+                    response = self.file_response(full_path, stat_result, scope)
+                    if response.status_code == 200:
+                        response.headers['Content-Encoding'] = encoding
+                    break
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if available:
+            response.headers['Vary'] = 'Accept-Encoding'
+        if hashed:
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
@@ -0,0 +1,36 @@
+import os
+import functools
+from collections.abc import Callable
+from typing import ParamSpec, TypeVar
+from anyio import CapacityLimiter, to_thread
+
+P = ParamSpec('P')
+T = TypeVar('T')
+
+# CPU-bound work (Markdown, Pygments, Jinja) gets few threads, since the GIL
+# serializes it anyway; blocking I/O (file reads, SMTP) can use more.
+RENDER_CONCURRENCY = int(os.getenv('RENDER_CONCURRENCY', '4'))
+IO_CONCURRENCY = int(os.getenv('IO_CONCURRENCY', '16'))
+
+_render_limiter: CapacityLimiter | None = None
+_io_limiter: CapacityLimiter | None = None
+
+def get_render_limiter() -> CapacityLimiter:
+    global _render_limiter
+    if _render_limiter is None:
+        _render_limiter = CapacityLimiter(RENDER_CONCURRENCY)
+    return _render_limiter
+
+def get_io_limiter() -> CapacityLimiter:
+    global _io_limiter
+    if _io_limiter is None:
+        _io_limiter = CapacityLimiter(IO_CONCURRENCY)
+    return _io_limiter
+
+async def run_render(func: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+    """Run CPU-heavy rendering in a worker thread, off the event loop"""
+    return await to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=get_render_limiter())
+
+async def run_io(func: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+    """Run blocking I/O in a worker thread, off the event loop"""
+    return await to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=get_io_limiter())
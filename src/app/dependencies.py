@@ -1,27 +1,140 @@
 import os
+import tempfile
+import threading
+from collections.abc import Hashable
 from fastapi.templating import Jinja2Templates
 from .services.blog_service import BlogService
 from .services.template_service import TemplateService
 from .services.email_service import EmailService
+from .services.email_queue import EmailQueue
+from .services.contact_throttle import ContactThrottle, MemoryRateLimitStore, RateLimit, RateLimitStore, SqliteRateLimitStore
+from .services.content_watcher import ContentWatcher
+from .services.response_cache import RESPONSE_CACHE_HOSTS, ResponseCache
+from .services.feed_service import FeedService
+from .services.fragment_service import FragmentService
+from .services.highlight_cache import HighlightCache
+from .services.icon_registry import IconRegistry
+from .services.image_service import ImageService
+from .assets import AssetManifest
 
 _blog_service: BlogService | None = None
 _templates: Jinja2Templates | None = None
 _email_service: EmailService | None = None
+_email_queue: EmailQueue | None = None
+_contact_throttle: ContactThrottle | None = None
+_content_watcher: ContentWatcher | None = None
+_response_cache: ResponseCache | None = None
+_fragment_service: FragmentService | None = None
+_template_service: TemplateService | None = None
+_asset_manifest: AssetManifest | None = None
+_image_service: ImageService | None = None
+_highlight_cache: HighlightCache | None = None
+_feed_service: FeedService | None = None
+# Startup warm-up and the first requests may race to build the same service
+_load_lock = threading.RLock()
 
 def get_blog_service() -> BlogService:
     global _blog_service
     if _blog_service is None:
-        _blog_service = BlogService()
+        with _load_lock:
+            if _blog_service is None:
+                # Sync dependencies run in the threadpool, so the first scan of the
+                # content tree happens here instead of inside an async handler
+                blog_service = BlogService(get_highlight_cache())
+                blog_service.load()
+                _blog_service = blog_service
     return _blog_service
 
+def get_fragment_service() -> FragmentService:
+    global _fragment_service
+    if _fragment_service is None:
+        with _load_lock:
+            if _fragment_service is None:
+                fragment_service = FragmentService(highlight_cache=get_highlight_cache())
+                fragment_service.load()
+                _fragment_service = fragment_service
+    return _fragment_service
+
+def get_highlight_cache() -> HighlightCache:
+    """The code block cache, shared by posts and fragments alike"""
+    global _highlight_cache
+    if _highlight_cache is None:
+        with _load_lock:
+            if _highlight_cache is None:
+                highlight_cache = HighlightCache(
+                    max_entries=int(os.getenv('HIGHLIGHT_CACHE_ENTRIES', '4096')),
+                    store_dir=os.getenv('HIGHLIGHT_CACHE_DIR', '') or None
+                )
+                highlight_cache.prune()
+                _highlight_cache = highlight_cache
+    return _highlight_cache
+
+def get_feed_service() -> FeedService:
+    global _feed_service
+    if _feed_service is None:
+        _feed_service = FeedService(
+            get_blog_service(),
+            hosts=get_cache_hosts(),
+            entries=int(os.getenv('FEED_ENTRIES', '20'))
+        )
+    return _feed_service
+
+def get_content_watcher() -> ContentWatcher:
+    global _content_watcher
+    if _content_watcher is None:
+        interval = float(os.getenv('CONTENT_WATCH_INTERVAL', '5'))
+        _content_watcher = ContentWatcher([get_blog_service(), get_fragment_service()], interval)
+    return _content_watcher
+
 def get_templates() -> Jinja2Templates:
     global _templates
     if _templates is None:
         _templates = Jinja2Templates(directory='templates')
     return _templates
 
+def get_response_cache() -> ResponseCache | None:
+    global _response_cache
+    max_entries = int(os.getenv('RESPONSE_CACHE_ENTRIES', '512'))
+    if _response_cache is None and max_entries > 0:
+        _response_cache = ResponseCache(max_entries, hosts=get_cache_hosts())
+    return _response_cache
+
+def get_cache_hosts() -> list[str]:
+    """Hosts pages and feeds are cached for, ALLOWED_HOSTS or the defaults"""
+    hosts = os.getenv('ALLOWED_HOSTS', '') or ','.join(RESPONSE_CACHE_HOSTS)
+    return [host.strip() for host in hosts.split(',') if host.strip()]
+
+def get_content_version() -> Hashable:
+    """Changes whenever anything that ends up in a rendered page changes"""
+    return (get_blog_service().version, get_fragment_service().version)
+
+def get_asset_manifest() -> AssetManifest:
+    global _asset_manifest
+    if _asset_manifest is None:
+        _asset_manifest = AssetManifest()
+    return _asset_manifest
+
+def get_image_service() -> ImageService:
+    global _image_service
+    if _image_service is None:
+        _image_service = ImageService()
+    return _image_service
+
 def get_template_service() -> TemplateService:
-    return TemplateService(get_templates())
+    global _template_service
+    if _template_service is None:
+        with _load_lock:
+            if _template_service is None:
+                icons = IconRegistry(sprite=os.getenv('ICON_SPRITE', '') == '1')
+                _template_service = TemplateService(
+                    get_templates(),
+                    get_response_cache(),
+                    get_content_version,
+                    icons,
+                    get_asset_manifest(),
+                    get_image_service()
+                )
+    return _template_service
 
 def get_email_service() -> EmailService:
     global _email_service
@@ -36,6 +149,36 @@ def get_email_service() -> EmailService:
             smtp_username,
             smtp_password,
             smtp_host,
-            smtp_port
+            smtp_port,
+            starttls=os.getenv('SMTP_STARTTLS', '1') == '1',
+            timeout=float(os.getenv('SMTP_TIMEOUT', '10'))
         )
     return _email_service
+
+def get_email_queue() -> EmailQueue:
+    global _email_queue
+    if _email_queue is None:
+        _email_queue = EmailQueue(
+            get_email_service(),
+            max_size=int(os.getenv('EMAIL_QUEUE_SIZE', '100')),
+            spool_dir=os.getenv('EMAIL_SPOOL_DIR', '') or None
+        )
+        _email_queue.start()
+    return _email_queue
+
+def get_contact_throttle() -> ContactThrottle:
+    global _contact_throttle
+    if _contact_throttle is None:
+        # Forked workers each have their own memory, so with several of them the
+        # limits only hold when they share a store
+        path = os.getenv('CONTACT_THROTTLE_DB', '')
+        if not path and int(os.getenv('WEB_WORKERS', '1')) > 1:
+            path = os.path.join(tempfile.gettempdir(), 'contact_throttle.sqlite3')
+        store: RateLimitStore = SqliteRateLimitStore(path) if path else MemoryRateLimitStore()
+        _contact_throttle = ContactThrottle(
+            store,
+            client_limit=RateLimit.parse(os.getenv('CONTACT_CLIENT_LIMIT', '5/3600')),
+            message_limit=RateLimit.parse(os.getenv('CONTACT_MESSAGE_LIMIT', '3/86400')),
+            duplicate_ttl=float(os.getenv('CONTACT_DUPLICATE_TTL', '3600'))
+        )
+    return _contact_throttle
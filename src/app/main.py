@@ -1,11 +1,18 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-import uvicorn
+from starlette.middleware.trustedhost import TrustedHostMiddleware
 import os
 
-from .routers import frontend, health, blog
+from .routers import frontend, health, blog, images, metrics, feeds
+from .dependencies import get_content_watcher, get_asset_manifest, get_contact_throttle, get_email_queue
+from .assets import AssetStaticFiles, STATIC_DIR
+from .concurrency import run_io
+from .metrics import MetricsMiddleware
+from .static_export import PrerenderedPages
+from .server import serve
+from .warmup import get_warm_up
 
 LOG_FORMAT = (
     "%(asctime)s | %(levelname)-8s | %(name)s | %(filename)s:%(lineno)d | "
@@ -28,9 +35,21 @@ async def lifespan(_: FastAPI):
             logger.info(f'Route: {route.name} | Path: {route.path} | Methods: {getattr(route, 'methods', 'N/A')}')  # pyright: ignore[reportAttributeAccessIssue]
     # Startup
     logger.info('Application starting...')
+    # Runs in the background so /health answers while /health/ready waits for it
+    warm_up = asyncio.create_task(get_warm_up().run(app))
+    watcher = await run_io(get_content_watcher)
+    watcher.start()
+    # Fails startup on an invalid CONTACT_*_LIMIT rather than the first submission
+    await run_io(get_contact_throttle)
+    # Started eagerly so messages spooled before a restart go out right away
+    email_queue = await run_io(get_email_queue) if os.getenv('SMTP_USERNAME', '') else None
     yield
     # Shutdown
     logger.info('Application shutting down...')
+    warm_up.cancel()
+    watcher.stop()
+    if email_queue is not None:
+        await run_io(email_queue.stop)
 
 def create_app() -> FastAPI:
     app = FastAPI(lifespan=lifespan)
@@ -38,22 +57,44 @@ def create_app() -> FastAPI:
     app.include_router(frontend.router)
     app.include_router(health.router)
     app.include_router(blog.router)
+    app.include_router(images.router)
+    app.include_router(metrics.router)
+    app.include_router(feeds.router)
 
-    static_dir = os.path.join(os.path.dirname(__file__), '../../static')
-    app.mount('/static', StaticFiles(directory=static_dir), name='static')
+    # Built assets (src/build_assets.py) take precedence over the sources
+    app.mount('/static', AssetStaticFiles(directory=STATIC_DIR, manifest=get_asset_manifest()), name='static')
+
+    # Serve pages pre-rendered by src/export.py, anything missing falls through
+    export_dir = os.getenv('STATIC_EXPORT_DIR', '')
+    if export_dir:
+        logger.info(f'Serving pre-rendered pages from {export_dir}')
+        app.add_middleware(PrerenderedPages, directory=export_dir)
+
+    # With ALLOWED_HOSTS set (comma separated), requests for any other Host get a 400
+    allowed_hosts = [host.strip() for host in os.getenv('ALLOWED_HOSTS', '').split(',') if host.strip()]
+    if allowed_hosts:
+        app.add_middleware(TrustedHostMiddleware, allowed_hosts=allowed_hosts)
+
+    # Added last so it is outermost and also times pre-rendered pages
+    app.add_middleware(MetricsMiddleware)
 
     return app
 
 def start_server() -> None:
-    logger.info('Starting uvicorn server on port 8027')
-    logger.info('Application URL: http://localhost:8027')
-
-    uvicorn.run(
-        'app.main:app',
-        host='0.0.0.0',
-        port=8027,
-        reload=False,
-        access_log=True
+    host = os.getenv('HOST', '0.0.0.0')
+    port = int(os.getenv('PORT', '8027'))
+    workers = int(os.getenv('WEB_WORKERS', '1'))
+    logger.info(f'Starting uvicorn server on {host}:{port} with {workers} workers')
+    logger.info(f'Application URL: http://localhost:{port}')
+
+    serve(
+        app,
+        host=host,
+        port=port,
+        workers=workers,
+        # 'auto' picks uvloop and httptools when they are installed
+        loop=os.getenv('UVICORN_LOOP', 'auto'),
+        http=os.getenv('UVICORN_HTTP', 'auto')
     )
 
 app = create_app()
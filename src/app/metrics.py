@@ -0,0 +1,225 @@
+import functools
+import math
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import ParamSpec, TypeVar
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+P = ParamSpec('P')
+T = TypeVar('T')
+
+# Seconds, from a cached page lookup up to a cold render of a long post
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HTTP_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'DELETE', 'CONNECT', 'OPTIONS', 'TRACE', 'PATCH'))
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def expose(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f'{self.name}{format_labels(self.labelnames, key)} {format_value(value)}'
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # labels -> (per-bucket counts, sum)
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * len(self.buckets), [0.0])
+            counts, total = entry
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            total[0] += value
+
+    def expose(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{format_value(bound)}"'
+                yield f'{self.name}_bucket{format_labels(self.labelnames, key, le)} {cumulative}'
+            labels = format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {format_value(total)}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+class Registry:
+    """
+    Metrics of this process, exposed in the Prometheus text format.
+
+    With several workers each process keeps its own, so every scrape sees
+    the worker that happened to answer it.
+    """
+
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def expose(self, collected: Iterable[tuple[str, str, str, dict[str, str], float]] = ()) -> str:
+        """
+        Render every metric, plus values kept elsewhere (such as cache
+        statistics) given as (name, type, help, labels, value).
+        """
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        documented: set[str] = set()
+        for name, kind, documentation, labels, value in sorted(collected, key=lambda sample: sample[0]):
+            if name not in documented:
+                documented.add(name)
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name}{format_labels(tuple(labels), tuple(labels.values()))} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds',
+    'Time from receiving a request until its response is sent',
+    ['method', 'route', 'status']
+)
+SPAN_DURATION = REGISTRY.histogram(
+    'app_span_duration_seconds',
+    'Time spent in instrumented sections of the app',
+    ['span']
+)
+SPAN_ERRORS = REGISTRY.counter(
+    'app_span_errors_total',
+    'Instrumented sections that raised',
+    ['span']
+)
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Record how long the block takes under app_span_duration_seconds{span=name}"""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        SPAN_ERRORS.inc(span=name)
+        raise
+    finally:
+        SPAN_DURATION.observe(time.perf_counter() - started, span=name)
+
+def timed(name: str) -> Callable[[Callable[P, T]], Callable[P, T]]:
+    """Decorator form of span"""
+    def decorator(func: Callable[P, T]) -> Callable[P, T]:
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def route_label(scope: Scope) -> str:
+    """The route template a request matched, so URLs with parameters share one label"""
+    route = scope.get('route')
+    if route is not None and hasattr(route, 'path'):
+        return route.path
+    if scope.get('prerendered'):
+        return 'prerendered'
+    if 'endpoint' in scope and scope.get('root_path'):
+        # A mounted app such as /static
+        return scope['root_path'] + '/{path}'
+    return 'unmatched'
+
+def method_label(scope: Scope) -> str:
+    """The request method, with anything nonstandard collapsed so clients can't add label values"""
+    method = scope['method']
+    return method if method in HTTP_METHODS else 'other'
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method, route and status"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                method=method_label(scope),
+                route=route_label(scope),
+                status=str(status)
+            )
@@ -1,10 +1,13 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+from dataclasses import dataclass
 from datetime import date
 
 class Author(BaseModel):
     name: str
 
 class Post(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     slug: str
     file: str
     title: str
@@ -19,6 +22,8 @@ class Post(BaseModel):
     attachments: list[str]
 
 class Series(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     slug: str
     title: str
     description: str
@@ -26,4 +31,33 @@ class Series(BaseModel):
     created: date
     status: str
     cover_image: str
-    posts: list[Post]
+    posts: tuple[Post, ...]
+
+@dataclass(frozen=True, slots=True)
+class PostRecord:
+    """
+    Compact form of a post's metadata kept by the content index. Repeated
+    strings are interned, dates live in the index's date columns at `row`.
+    """
+    row: int
+    slug: str
+    file: str
+    title: str
+    authors: tuple[str, ...]
+    description: str
+    tags: tuple[str, ...]
+    draft: bool
+    featured: bool
+    cover_image: str
+    attachments: tuple[str, ...]
+
+@dataclass(frozen=True, slots=True)
+class SeriesRecord:
+    slug: str
+    title: str
+    description: str
+    authors: tuple[str, ...]
+    created: date
+    status: str
+    cover_image: str
+    posts: tuple[PostRecord, ...]
@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+from collections import Counter
+from types import FrameType
+
+# Off unless explicitly enabled, since it exposes the code's call stacks
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', '') == '1'
+PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL', '0.005'))
+PROFILER_MAX_SECONDS = 60.0
+
+def collapse(frame: FrameType | None) -> str:
+    """One stack as root;...;leaf, the collapsed format flame graph tools read"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every other thread at a fixed interval.
+
+    It only looks at frames from a background thread, so the code being
+    profiled runs unmodified; the cost is one stack walk per thread per
+    sample, and nothing at all while it is not running.
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL):
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> bool:
+        """Start sampling, False if a profile is already being taken"""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.samples = Counter()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> str:
+        """Stop sampling and return the samples, one 'stack count' line each"""
+        with self._lock:
+            if self._thread is None:
+                return ''
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                self.samples[f'{names.get(ident, ident)};{collapse(frame)}'] += 1
+
+_profiler: SamplingProfiler | None = None
+
+def get_profiler() -> SamplingProfiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler()
+    return _profiler
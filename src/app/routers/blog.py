@@ -2,58 +2,84 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from fastapi.responses import HTMLResponse
 from ..dependencies import BlogService, get_blog_service, TemplateService, get_template_service
+from ..models import Post
+from ..services.blog_service import PostUnavailableError
+from ..concurrency import run_render
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=['blog'])
 
+async def render_body(blog_service: BlogService, post: Post) -> str:
+    try:
+        return await run_render(blog_service.render_post_body, post)
+    except PostUnavailableError as e:
+        logger.warning(f'Post body unavailable: {e}')
+        raise HTTPException(status_code=503, detail='Post is being updated', headers={'Retry-After': '5'})
+
 @router.get('/blog', response_class=HTMLResponse)
 async def blog(
     request: Request,
     search: str = Query(None, description='Search term'),
     tag: str = Query(None, description='Filter by tag'),
+    page: int = Query(1, ge=1, description='Page number'),
+    after: str = Query(None, description='Slug of the last post on the previous page'),
     blog_service: BlogService = Depends(get_blog_service),
     template_service: TemplateService = Depends(get_template_service)
 ):
-    all_posts = blog_service.get_latest_posts(limit=100, include_drafts=False)
-    featured_posts = blog_service.get_featured_posts(limit=6, include_drafts=False)
-    all_series = blog_service.series
-
-    filtered_posts = all_posts
-
     if search:
-        search_lower = search.lower()
-        filtered_posts = [
-            post for post in filtered_posts
-            if search_lower in post.title.lower() or
-               search_lower in post.description.lower() or
-               any(search_lower in tag.lower() for tag in post.tags)
-        ]
-
-    if tag:
-        filtered_posts = [
-            post for post in filtered_posts
-            if tag in post.tags
-        ]
+        posts_page = blog_service.search_posts(search, tag=tag or None, page=page)
+    else:
+        posts_page = blog_service.list_posts(tag=tag or None, page=page, after=after)
+    if posts_page.number > posts_page.pages:
+        raise HTTPException(status_code=404, detail='Page not found')
 
-    all_tags = set()
-    for post in all_posts:
-        all_tags.update(post.tags)
-    all_tags = sorted(list(all_tags))
+    featured_posts = blog_service.get_featured_posts(limit=6, include_drafts=False)
+    all_series = blog_service.list_series(include_drafts=False)
 
-    return template_service.render(
+    return await run_render(
+        template_service.render,
         'blog.html',
         {
             'featured_posts': featured_posts,
             'series': all_series,
-            'posts': filtered_posts,
-            'all_tags': all_tags,
+            'posts': posts_page.posts,
+            'page': posts_page,
+            'all_tags': blog_service.get_tags(),
+            'tag_counts': blog_service.get_tag_counts(),
             'current_search': search,
             'current_tag': tag,
+            # Page links carry only the filters, never other query parameters,
+            # as the response cache key ignores those
+            'page_filters': {name: value for name, value in (('search', search), ('tag', tag)) if value},
             'title': 'Emil\'s Blog'
         },
-        request
+        request,
+        blog_service.get_last_updated()
     )
 
+@router.get('/blog/search')
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description='Search query'),
+    limit: int = Query(10, ge=1, le=50, description='Maximum number of results'),
+    blog_service: BlogService = Depends(get_blog_service)
+):
+    results = blog_service.search(q, limit=limit)
+    return {
+        'query': q,
+        'results': [
+            {
+                'slug': result.post.slug,
+                'url': f'/blog/p/{result.post.slug}',
+                'title': result.post.title,
+                'description': result.post.description,
+                'tags': result.post.tags,
+                'created': result.post.created.isoformat(),
+                'score': round(result.score, 4)
+            }
+            for result in results
+        ]
+    }
+
 @router.get('/blog/p/{post_slug}', response_class=HTMLResponse)
 async def post(
     request: Request,
@@ -65,10 +91,11 @@ async def post(
     if not post:
         raise HTTPException(status_code=404, detail='Post not found')
     
-    html_body = blog_service.render_post_body(post)
+    html_body = await render_body(blog_service, post)
     series_list = blog_service.get_series_of_post(post_slug)
 
-    return template_service.render_post(
+    return await run_render(
+        template_service.render_post,
         {
             'post': post,
             'body': html_body,
@@ -77,7 +104,8 @@ async def post(
             'navigation': None,
             'title': post.title
         },
-        request
+        request,
+        post.updated
     )
 
 @router.get('/blog/s/{series_slug}', response_class=HTMLResponse)
@@ -91,14 +119,16 @@ async def series(
     if not series:
         raise HTTPException(status_code=404, detail='Series not found')
     
-    return template_service.render(
+    return await run_render(
+        template_service.render,
         'series.html',
         {
             'series': series,
             'posts': series.posts,
             'title': series.title
         },
-        request
+        request,
+        blog_service.get_last_updated(series)
     )
 
 @router.get('/blog/s/{series_slug}/p/{post_slug}', response_class=HTMLResponse)
@@ -117,15 +147,16 @@ async def post_in_series(
     if not series:
         raise HTTPException(status_code=404, detail='Series not found.')
     
-    # Check if post is in this series
-    if not any(p.slug == post_slug for p in series.posts):
+    # Navigation only exists for posts that are in this series
+    navigation = blog_service.get_series_navigation(series_slug, post_slug)
+    if navigation is None:
         raise HTTPException(status_code=404, detail='Post not found in this series')
     
-    html_body = blog_service.render_post_body(post)
+    html_body = await render_body(blog_service, post)
     series_list = blog_service.get_series_of_post(post_slug)
-    navigation = blog_service.get_series_navigation(series_slug, post_slug)
 
-    return template_service.render_post(
+    return await run_render(
+        template_service.render_post,
         {
             'post': post,
             'body': html_body,
@@ -134,5 +165,6 @@ async def post_in_series(
             'navigation': navigation,
             'title': f'{post.title} | {series.title}'
         },
-        request
+        request,
+        max(post.updated, blog_service.get_last_updated(series))
     )
@@ -0,0 +1,33 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response
+from ..dependencies import FeedService, get_feed_service
+from ..services.blog_service import PostUnavailableError
+from ..concurrency import run_render
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=['feeds'])
+
+async def feed_response(kind: str, request: Request, feed_service: FeedService) -> Response:
+    # Any other Host would end up in the links and fill the caches with copies
+    if not feed_service.serves(request):
+        raise HTTPException(status_code=404)
+    # Generating a feed renders post bodies, but usually it is already cached
+    try:
+        feed = await run_render(feed_service.get, kind, str(request.base_url))
+    except PostUnavailableError as e:
+        logger.warning(f'Feed unavailable: {e}')
+        raise HTTPException(status_code=503, headers={'Retry-After': '5'})
+    return feed.to_response(request)
+
+@router.get('/atom.xml', response_class=Response)
+async def atom_feed(request: Request, feed_service: FeedService = Depends(get_feed_service)):
+    return await feed_response('atom', request, feed_service)
+
+@router.get('/feed.xml', response_class=Response)
+async def rss_feed(request: Request, feed_service: FeedService = Depends(get_feed_service)):
+    return await feed_response('rss', request, feed_service)
+
+@router.get('/sitemap.xml', response_class=Response)
+async def sitemap(request: Request, feed_service: FeedService = Depends(get_feed_service)):
+    return await feed_response('sitemap', request, feed_service)
@@ -1,33 +1,34 @@
+import math
 import os
 import logging
-from fastapi import APIRouter, Depends, Request, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, Form
 from fastapi.responses import FileResponse, HTMLResponse
-from markdown import markdown
 from ..dependencies import (
     TemplateService,
     get_template_service,
     BlogService,
     get_blog_service,
-    EmailService,
-    get_email_service,
+    EmailQueue,
+    get_email_queue,
+    ContactThrottle,
+    get_contact_throttle,
+    FragmentService,
+    get_fragment_service,
 )
+from ..concurrency import run_io, run_render
+from ..services.response_cache import latest
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=['frontend'])
 
-CONTENT_DIR = os.path.join(os.path.dirname(__file__), '../../../content')
-
 @router.get('/', response_class=HTMLResponse)
 async def serve_frontend(
     request: Request,
     template_service: TemplateService = Depends(get_template_service),
-    blog_service: BlogService = Depends(get_blog_service)
+    blog_service: BlogService = Depends(get_blog_service),
+    fragment_service: FragmentService = Depends(get_fragment_service)
 ):
-    hero_md_path = os.path.join(CONTENT_DIR, 'home', 'hero.md')
-    with open(hero_md_path, 'r', encoding='utf-8') as f:
-        hero_md_content = f.read()
-
-    hero_html = markdown(hero_md_content, extensions=['fenced_code', 'codehilite', 'tables'])
+    hero_html = fragment_service.get('hero')
 
     latest_posts = blog_service.get_latest_posts(limit=3, include_drafts=False)
     project_summaries = blog_service.get_series('project-summaries')
@@ -38,7 +39,8 @@ async def serve_frontend(
         'latest_posts': latest_posts,
         'project_summaries': project_summaries
     }
-    return template_service.render_index(context, request)
+    last_modified = latest(blog_service.get_last_updated(), fragment_service.modified('hero'))
+    return await run_render(template_service.render_index, context, request, last_modified)
 
 @router.get('/favicon.ico', include_in_schema=False, response_class=HTMLResponse)
 async def serve_favicon():
@@ -48,30 +50,24 @@ async def serve_favicon():
 async def serve_about(
     request: Request,
     template_service: TemplateService = Depends(get_template_service),
+    fragment_service: FragmentService = Depends(get_fragment_service),
 ):
-    about_md_path = os.path.join(CONTENT_DIR, 'home', 'about.md')
-    with open(about_md_path, 'r', encoding='utf-8') as f:
-        about_md_content = f.read()
-
-    about_html = markdown(about_md_content, extensions=['fenced_code', 'codehilite', 'tables'])
+    about_html = fragment_service.get('about')
 
     context = {
         'request': request,
         'title': 'About Emil',
         'about': about_html,
     }
-    return template_service.render('about.html', context, request)
+    return await run_render(template_service.render, 'about.html', context, request, fragment_service.modified('about'))
 
 @router.get('/contact', response_class=HTMLResponse)
 async def serve_contact(
     request: Request,
     template_service: TemplateService = Depends(get_template_service),
+    fragment_service: FragmentService = Depends(get_fragment_service),
 ):
-    contact_md_path = os.path.join(CONTENT_DIR, 'home', 'contact.md')
-    with open(contact_md_path, 'r', encoding='utf-8') as f:
-        contact_md_content = f.read()
-
-    contact_html = markdown(contact_md_content, extensions=['fenced_code', 'codehilite', 'tables'])
+    contact_html = fragment_service.get('contact')
 
     context = {
         'request': request,
@@ -79,17 +75,39 @@ async def serve_contact(
         'contact': contact_html,
         'show_form': os.getenv('SMTP_USERNAME', '')
     }
-    return template_service.render('contact.html', context, request)
+    return await run_render(template_service.render, 'contact.html', context, request, fragment_service.modified('contact'))
+
+def too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail='Too many contact form submissions, please try again later',
+        headers={'Retry-After': str(math.ceil(retry_after))}
+    )
+
+async def throttle_client(
+    request: Request,
+    throttle: ContactThrottle = Depends(get_contact_throttle)
+) -> ContactThrottle:
+    """Rejects clients over the limit before any rendering or mail work"""
+    # The real client behind the reverse proxy, see FORWARDED_ALLOW_IPS in server.py
+    client = request.client.host if request.client else 'unknown'
+    retry_after = await run_io(throttle.check_client, client)
+    if retry_after:
+        logger.warning(f'Throttled contact form submission from {client}')
+        raise too_many_requests(retry_after)
+    return throttle
 
 @router.post('/contact', response_class=HTMLResponse)
 async def process_contact_form(
     request: Request,
+    throttle: ContactThrottle = Depends(throttle_client),
     name: str = Form(...),
     email: str = Form(...),
     topic: str = Form('General question'),
     message: str = Form(...),
-    email_service: EmailService = Depends(get_email_service),
+    email_queue: EmailQueue = Depends(get_email_queue),
     template_service: TemplateService = Depends(get_template_service),
+    fragment_service: FragmentService = Depends(get_fragment_service),
 ):
     errors = []
     if not name.strip():
@@ -99,11 +117,7 @@ async def process_contact_form(
     if len(message) > 5000:
         errors.append('Message too long')
 
-    contact_md_path = os.path.join(CONTENT_DIR, 'home', 'contact.md')
-    with open(contact_md_path, 'r', encoding='utf-8') as f:
-        contact_md_content = f.read()
-
-    contact_html = markdown(contact_md_content, extensions=['fenced_code', 'codehilite', 'tables'])
+    contact_html = fragment_service.get('contact')
 
     if errors:
         context = {
@@ -114,8 +128,25 @@ async def process_contact_form(
             'error_message': ' • '.join(errors),
             'form_data': {'name': name, 'email': email, 'topic': topic, 'message': message}
         }
-        return template_service.render('contact.html', context, request)
+        return await run_render(template_service.render, 'contact.html', context, request)
     
+    success_context = {
+        'request': request,
+        'title': 'Contact Emil',
+        'contact': contact_html,
+        'show_form': True,
+        'success_message': "Thanks for reaching out! I'll get back to you within 24-72 hours."
+    }
+    if not await run_io(throttle.claim, email, message):
+        # Same message resubmitted, it is already on its way
+        return await run_render(template_service.render, 'contact.html', success_context, request)
+
+    retry_after = await run_io(throttle.check_message, message)
+    if retry_after:
+        await run_io(throttle.release, email, message)
+        logger.warning('Throttled a repeated contact form message')
+        raise too_many_requests(retry_after)
+
     try:
         email_content = f"""
 New contact form submission from emilpopovic.me
@@ -131,18 +162,12 @@ Message:
 Sent from your personal website contact form
         """.strip()
 
-        email_service.send_email(content=email_content)
-
-        context = {
-            'request': request,
-            'title': 'Contact Emil',
-            'contact': contact_html,
-            'show_form': True,
-            'success_message': "Thanks for reaching out! I'll get back to you within 24-72 hours."
-        }
-        return template_service.render('contact.html', context, request)
+        # Delivery happens on the queue's worker thread, submit only spools the message
+        await run_io(email_queue.submit, content=email_content)
+        return await run_render(template_service.render, 'contact.html', success_context, request)
     
     except Exception as e:
+        await run_io(throttle.release, email, message)
         print(f'Failed to send contact form email: {e}')
         context = {
             'request': request,
@@ -152,4 +177,4 @@ Sent from your personal website contact form
             'error_message': "That didn't work. Please contact me in a different way. /(._. )\\",
             'form_data': {'name': name, 'email': email, 'topic': topic, 'message': message}
         }
-        return template_service.render('contact.html', context, request)
+        return await run_render(template_service.render, 'contact.html', context, request)
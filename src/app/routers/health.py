@@ -1,6 +1,7 @@
 import logging
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 from datetime import datetime, timezone
+from ..warmup import get_warm_up
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=['health'])
@@ -14,5 +15,11 @@ async def health():
     }
 
 @router.get('/health/ready')
-async def readyness_check():
-    return {'status': 'ready'}
+async def readyness_check(response: Response):
+    warm_up = get_warm_up()
+    if warm_up.ready:
+        status = 'ready'
+    else:
+        status = 'failed' if warm_up.error else 'warming up'
+        response.status_code = 503
+    return {'status': status, **warm_up.report()}
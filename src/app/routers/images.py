@@ -0,0 +1,27 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from ..dependencies import ImageService, get_image_service
+from ..concurrency import run_render
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=['images'])
+
+@router.get('/img/{width}/{path:path}', include_in_schema=False)
+async def image_derivative(
+    width: int,
+    path: str,
+    image_service: ImageService = Depends(get_image_service)
+):
+    stem, _, fmt = path.rpartition('.')
+    source = await run_render(image_service.find_source, stem) if stem else None
+    if source is None:
+        raise HTTPException(status_code=404, detail='Image not found')
+
+    try:
+        file_path = await run_render(image_service.derivative, source, width, fmt)
+    except ValueError:
+        raise HTTPException(status_code=404, detail='Image size not available')
+
+    # URLs carry the source fingerprint, so the bytes behind them never change
+    return FileResponse(file_path, headers={'Cache-Control': 'public, max-age=31536000, immutable'})
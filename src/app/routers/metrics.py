@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import os
+import secrets
+from collections.abc import Iterator
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from ..dependencies import get_blog_service, get_feed_service, get_highlight_cache, get_response_cache
+from ..metrics import REGISTRY
+from ..profiler import PROFILER_ENABLED, PROFILER_MAX_SECONDS, get_profiler
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=['metrics'])
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def require_metrics_token(request: Request) -> None:
+    """With METRICS_TOKEN set, require it as a bearer token"""
+    token = os.getenv('METRICS_TOKEN', '')
+    if not token:
+        return
+    scheme, _, given = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not secrets.compare_digest(given.encode(), token.encode()):
+        raise HTTPException(status_code=401, headers={'WWW-Authenticate': 'Bearer'})
+
+def cache_samples(name: str, stats: dict) -> Iterator[tuple[str, str, str, dict[str, str], float]]:
+    labels = {'cache': name}
+    yield 'app_cache_hits_total', 'counter', 'Cache lookups that found an entry', labels, stats['hits']
+    yield 'app_cache_misses_total', 'counter', 'Cache lookups that found nothing', labels, stats['misses']
+    yield 'app_cache_evictions_total', 'counter', 'Entries evicted to stay within the limits', labels, stats['evictions']
+    yield 'app_cache_entries', 'gauge', 'Entries currently cached', labels, stats['entries']
+    yield 'app_cache_weight', 'gauge', 'Total weight of the cached entries, bytes for page caches', labels, stats['weight']
+
+@router.get('/metrics', response_class=PlainTextResponse, dependencies=[Depends(require_metrics_token)])
+def metrics():
+    samples = list(cache_samples('post_render', get_blog_service().render_cache_stats()))
+    samples.extend(cache_samples('highlight', get_highlight_cache().stats()))
+    for name, stats in get_feed_service().stats().items():
+        samples.extend(cache_samples(name, stats))
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        samples.extend(cache_samples('response', response_cache.stats()))
+    return PlainTextResponse(REGISTRY.expose(samples), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@router.get('/debug/profile', response_class=PlainTextResponse, dependencies=[Depends(require_metrics_token)])
+async def profile(seconds: float = Query(10.0, gt=0, le=PROFILER_MAX_SECONDS)):
+    """Sample every thread for a while and return collapsed stacks for a flame graph"""
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404)
+    profiler = get_profiler()
+    if not profiler.start():
+        raise HTTPException(status_code=409, detail='A profile is already being taken')
+    logger.info(f'Profiling for {seconds:g}s')
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        stacks = profiler.stop()
+    return PlainTextResponse(stacks)
@@ -0,0 +1,114 @@
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+import uvicorn
+from fastapi import FastAPI
+from .warmup import get_warm_up
+
+logger = logging.getLogger(__name__)
+
+# A worker that dies sooner than this after starting is restarted with a delay
+MIN_WORKER_UPTIME = 5.0
+
+def preload() -> None:
+    """
+    Run the warm-up stages that do not need an event loop, so forked
+    workers share their results copy-on-write.
+    """
+    get_warm_up().run_sync()
+
+    # Objects that survive this collection are never touched by the cyclic
+    # GC again, which would otherwise dirty their shared pages in workers
+    gc.collect()
+    gc.freeze()
+
+class Supervisor:
+    """Forks uvicorn workers that share one listening socket and restarts ones that die"""
+
+    def __init__(self, config: uvicorn.Config, sock: socket.socket, workers: int):
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        self.children: dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                uvicorn.Server(self.config).run(sockets=[self.sock])
+            except BaseException:
+                logger.exception('Worker crashed')
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info(f'Started worker {pid}')
+
+    def stop(self, signum: int, _) -> None:
+        self.stopping = True
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM if signum == signal.SIGINT else signum)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            logger.warning(f'Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting')
+            if time.monotonic() - started < MIN_WORKER_UPTIME:
+                time.sleep(1)
+            if not self.stopping:
+                self.spawn()
+        self.sock.close()
+        logger.info('All workers stopped')
+
+def serve(app: FastAPI, host: str, port: int, workers: int = 1, loop: str = 'auto', http: str = 'auto') -> None:
+    """
+    Run the app with uvicorn.
+
+    Content is loaded before serving. With more than one worker the process
+    binds the socket and forks, instead of uvicorn's own multi-worker mode,
+    which spawns fresh interpreters that would each load everything again.
+    """
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        loop=loop,
+        http=http,
+        access_log=True,
+        # Take the client address from X-Forwarded-For when the peer is one of these
+        # proxies, '*' trusts any peer, for when only the proxy can reach the app
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv('FORWARDED_ALLOW_IPS', '127.0.0.1')
+    )
+    started = time.perf_counter()
+    preload()
+    logger.info(f'Preloaded content in {(time.perf_counter() - started) * 1000:.0f}ms')
+
+    if workers <= 1:
+        uvicorn.Server(config).run()
+        return
+
+    sock = config.bind_socket()
+    logger.info(f'Forking {workers} workers')
+    Supervisor(config, sock, workers).run()
@@ -1,170 +1,479 @@
 import logging
 import os
+import sys
+import threading
 import yaml
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from collections.abc import Mapping
+from dataclasses import replace
+from functools import partial
 from datetime import date
-from ..models import Author, Post, Series
-import markdown
+from typing import NamedTuple, TextIO
+from ..metrics import span, timed
+from ..models import Post, PostRecord, Series, SeriesRecord
+from .cache import LRUCache
+from .content_index import ContentIndex, PostPage
+from .content_snapshot import read_snapshot, write_snapshot
+from .highlight_cache import HighlightCache
+from .markdown_pool import MarkdownPool, create_post_markdown
+from .search_index import SearchResult, tokenize
 
 logger = logging.getLogger(__name__)
 
-CONTENT_DIR = os.path.join(os.path.dirname(__file__), '../../../content')
+CONTENT_DIR = os.getenv('CONTENT_DIR', os.path.join(os.path.dirname(__file__), '../../../content'))
 POSTS_DIR = os.path.join(CONTENT_DIR, 'posts')
 SERIES_DIR = os.path.join(CONTENT_DIR, 'series')
+# Written by src/build_snapshot.py, empty disables it
+SNAPSHOT_PATH = os.getenv(
+    'CONTENT_SNAPSHOT',
+    os.path.normpath(os.path.join(os.path.dirname(__file__), '../../../build/content.snapshot'))
+)
+
+PAGE_SIZE = 20
+
+RENDER_CACHE_MAX_ENTRIES = 256
+RENDER_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# libyaml's C loader is several times faster than the pure-Python one
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+FRONTMATTER_DELIMITER = '---'
+
+def read_frontmatter(f: TextIO, parse: bool = True) -> dict:
+    """
+    Read the front matter block of an open post, stopping at its closing
+    delimiter so the file is left positioned at the start of the body.
+
+    Files without a leading delimiter have no front matter and are
+    rewound. With parse=False the block is skipped without parsing it.
+    """
+    first = f.readline()
+    if first.strip() != FRONTMATTER_DELIMITER:
+        f.seek(0)
+        return {}
+    lines = []
+    while line := f.readline():
+        if line.strip() == FRONTMATTER_DELIMITER:
+            break
+        lines.append(line)
+    else:
+        raise ValueError(f'{getattr(f, "name", "post")}: front matter has no closing {FRONTMATTER_DELIMITER!r}')
+    if not parse:
+        return {}
+    return yaml.load(''.join(lines), Loader=YAML_LOADER) or {}
+
+def read_body(md_path: str) -> str:
+    """Body of a post without parsing its front matter"""
+    with open(md_path, 'r', encoding='utf-8') as f:
+        read_frontmatter(f, parse=False)
+        return f.read()
+
+def text(meta: dict, key: str, default: str = '') -> str:
+    value = meta.get(key, default)
+    if not isinstance(value, str):
+        raise ValueError(f'{key} must be a string, not {type(value).__name__}')
+    return value
+
+def flag(meta: dict, key: str) -> bool:
+    value = meta.get(key, False)
+    if not isinstance(value, bool):
+        raise ValueError(f'{key} must be true or false, not {value!r}')
+    return value
+
+def names(meta: dict, key: str) -> tuple[str, ...]:
+    """A list of strings, interned since the same tags and authors repeat across posts"""
+    values = meta.get(key) or []
+    try:
+        if not isinstance(values, list):
+            raise TypeError
+        # intern() only accepts str, which checks the items on the way
+        return tuple(map(sys.intern, values))
+    except TypeError:
+        raise ValueError(f'{key} must be a list of strings') from None
 
 def parse_frontmatter(md_path):
     with open(md_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+        data = read_frontmatter(f)
+        return data, f.read()
+
+def scan_dir(directory: str, suffix: str) -> dict[str, tuple[int, int]]:
+    """Map file names with the given suffix to (mtime_ns, size) fingerprints"""
+    fingerprints = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(suffix) and entry.is_file():
+                stat = entry.stat()
+                fingerprints[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return fingerprints
+
+def series_post_slugs(meta: dict) -> list[str]:
+    """Post slugs of a series file in reading order"""
+    posts_data = meta.get('posts', [])
+    if posts_data and isinstance(posts_data[0], dict):
+        posts_data = sorted(posts_data, key=lambda p: p.get('order', 0))
+        return [p['slug'] for p in posts_data]
+    return posts_data
 
-    if lines[0].strip() == '---':
-        end = next(i for i, line in enumerate(lines[1:], 1) if line.strip() == '---')
-        frontmatter = ''.join(lines[1:end])
-        body = ''.join(lines[end+1:])
-        data = yaml.safe_load(frontmatter)
-        return data, body
-    return {}, ''.join(lines)
+class PostUnavailableError(Exception):
+    """The accepted version of a post was never rendered and its file no longer parses"""
+
+class LoadedPost(NamedTuple):
+    # Row is assigned when the index is built
+    record: PostRecord
+    # Date ordinals
+    created: int
+    updated: int
+    # Body term counts for the search index, so bodies need not stay in memory
+    body_terms: Counter
 
 class BlogService:
-    def __init__(self):
-        self._posts: list[Post] | None = None
-        self._series: list[Series] | None = None
-        self._md = markdown.Markdown(extensions=[
-            'codehilite',
-            'fenced_code', 
-            'tables',
-            'toc'
-        ], extension_configs={
-            'codehilite': {
-                'css_class': 'highlight',
-                'use_pygments': True,
-                'noclasses': False
+    def __init__(self, highlight_cache: HighlightCache | None = None):
+        self._index: ContentIndex | None = None
+        self._version = 0
+        self._reload_lock = threading.Lock()
+        # Last scan of the content tree, used to skip no-op reloads
+        self._fingerprints: tuple[dict, dict] | None = None
+        # file name -> (fingerprint, parsed entry), reused while unchanged
+        self._post_entries: dict[str, tuple[tuple[int, int], LoadedPost | None]] = {}
+        self._series_entries: dict[str, tuple[tuple[int, int], dict | None]] = {}
+        # (slug, mtime_ns, size) -> rendered html, stale fingerprints age out
+        self._render_cache: LRUCache[tuple[str, int, int], str] = LRUCache(
+            RENDER_CACHE_MAX_ENTRIES,
+            max_weight=RENDER_CACHE_MAX_BYTES,
+            weigh=len
+        )
+        # Last good renders of posts whose newer file failed to load, which the
+        # render cache must not evict as they can't be rendered again
+        self._pinned_html: dict[tuple[str, int, int], str] = {}
+        # Bodies rendered into the snapshot, all kept rather than competing for
+        # the render cache, and dropped once their file changes
+        self._snapshot_html: dict[tuple[str, int, int], str] = {}
+        self._md_pool = MarkdownPool(partial(create_post_markdown, highlight_cache))
+
+    def load(self) -> None:
+        """Eagerly read all posts and series, from the snapshot when there is one"""
+        if SNAPSHOT_PATH and self._index is None:
+            self.load_snapshot(SNAPSHOT_PATH)
+        _ = self.index
+
+    @timed('content.snapshot')
+    def load_snapshot(self, path: str) -> bool:
+        """
+        Install the content from a snapshot file.
+
+        If the content tree changed since the snapshot was built, its entries
+        only seed an incremental reload, so just the changed files are parsed
+        again. Returns whether the snapshot was used.
+        """
+        data = read_snapshot(path)
+        if data is None:
+            return False
+        with self._reload_lock:
+            self._snapshot_html = data['rendered']
+            self._post_entries = data['post_entries']
+            self._series_entries = data['series_entries']
+            fingerprints = (scan_dir(POSTS_DIR, '.md'), scan_dir(SERIES_DIR, '.yaml'))
+            if fingerprints == data['fingerprints']:
+                self._fingerprints = fingerprints
+                self._index = data['index']
+                self._version += 1
+                logger.info(f'Content index v{self._version}: {len(self._index.posts)} posts from snapshot {path}')
+                return True
+
+        logger.info(f'Content snapshot {path} is stale, re-parsing changed files')
+        self.reload(strict=True)
+        return True
+
+    def write_snapshot(self, path: str) -> int:
+        """Write the current content, with every post body rendered, to a snapshot file"""
+        index = self.index
+        rendered = {}
+        for post in index.posts:
+            rendered[self.post_fingerprint(post)] = self.render_post_body(post)
+        with self._reload_lock:
+            data = {
+                'fingerprints': self._fingerprints,
+                'post_entries': self._post_entries,
+                'series_entries': self._series_entries,
+                'index': self._index,
+                'rendered': rendered,
             }
-        })
+            return write_snapshot(path, data)
+
+    @property
+    def index(self) -> ContentIndex:
+        index = self._index
+        if index is None:
+            self.reload(strict=True)
+            index = self._index
+            assert index is not None
+        return index
+
+    @property
+    def version(self) -> int:
+        """Incremented every time a new index is swapped in"""
+        return self._version
+
+    @timed('content.reload')
+    def reload(self, strict: bool = False) -> bool:
+        """
+        Re-scan the content tree and swap in a new index if anything changed.
+
+        Only files whose mtime or size changed are parsed again. Readers keep
+        using the previous index until the new one is fully built. Returns
+        whether a new index was installed.
+        """
+        with self._reload_lock:
+            post_files = scan_dir(POSTS_DIR, '.md')
+            series_files = scan_dir(SERIES_DIR, '.yaml')
+            if self._index is not None and self._fingerprints == (post_files, series_files):
+                return False
+
+            post_entries = self._refresh_entries(post_files, self._post_entries, self._load_post, strict)
+            series_entries = self._refresh_entries(series_files, self._series_entries, self._load_series_meta, strict)
+
+            loaded = [entry for _, entry in post_entries.values() if entry is not None]
+            posts = [replace(entry.record, row=row) for row, entry in enumerate(loaded)]
+            created = array('l', (entry.created for entry in loaded))
+            updated = array('l', (entry.updated for entry in loaded))
+            posts_by_slug: dict[str, PostRecord] = {}
+            for post in posts:
+                posts_by_slug.setdefault(post.slug, post)
+            series = [
+                self._build_series(fname, meta, posts_by_slug)
+                for fname, (_, meta) in series_entries.items()
+                if meta
+            ]
+            body_terms = {entry.record.slug: entry.body_terms for entry in loaded}
+            index = ContentIndex.build(posts, created, updated, series, body_terms)
+
+            self._post_entries = post_entries
+            self._series_entries = series_entries
+            self._fingerprints = (post_files, series_files)
+            self._index = index
+            self._version += 1
+            self._pinned_html = self._pin_rejected(post_files, post_entries)
+            if self._snapshot_html:
+                current = {(entry.record.slug, *fingerprint) for fingerprint, entry in post_entries.values() if entry}
+                self._snapshot_html = {key: html for key, html in self._snapshot_html.items() if key in current}
+
+        logger.info(f'Content index v{self._version}: {len(index.posts)} posts, {len(index.series)} series')
+        return True
+
+    @staticmethod
+    def _refresh_entries(files: dict, previous: dict, load, strict: bool) -> dict:
+        entries = {}
+        for fname, fingerprint in files.items():
+            old = previous.get(fname)
+            if old is not None and old[0] == fingerprint:
+                entries[fname] = old
+                continue
+            try:
+                entries[fname] = (fingerprint, load(fname))
+            except Exception:
+                if strict:
+                    raise
+                # Most likely a half-written file; keep serving the last good version
+                logger.exception(f'Failed to load {fname}, keeping previous version')
+                if old is not None:
+                    entries[fname] = old
+        return entries
+
+    def _pin_rejected(self, post_files: dict, post_entries: dict) -> dict[tuple[str, int, int], str]:
+        """Renders of the kept versions of posts whose file changed but failed to load"""
+        pinned = {}
+        for fname, (fingerprint, entry) in post_entries.items():
+            if entry is None or post_files.get(fname) == fingerprint:
+                continue
+            key = (entry.record.slug, *fingerprint)
+            html = self._pinned_html.get(key) or self._render_cache.get(key)
+            if html is not None:
+                pinned[key] = html
+        return pinned
+
+    def validate(self) -> list[str]:
+        """Problems in the loaded content that do not stop it from loading"""
+        index = self.index
+        problems = []
+        for fname, (_, entry) in self._post_entries.items():
+            if entry is not None and index.posts_by_slug[entry.record.slug].file != fname:
+                problems.append(f'{fname}: duplicate slug {entry.record.slug!r} is shadowed')
+        for fname, (_, meta) in self._series_entries.items():
+            for slug in series_post_slugs(meta or {}):
+                if slug not in index.posts_by_slug:
+                    problems.append(f'{fname}: unknown post {slug!r}')
+        return problems
 
     def get_post(self, slug: str) -> Post | None:
-        for post in self.posts:
-            if post.slug == slug:
-                return post
-        return None
+        index = self.index
+        record = index.posts_by_slug.get(slug)
+        return index.post_model(record) if record is not None else None
     
     def get_series(self, slug: str, include_drafts: bool = False) -> Series | None:
-        for series in self.series:
-            if series.slug == slug:
-                if not include_drafts:
-                    posts = [post for post in series.posts if not post.draft]
-                    series.posts = posts
-                return series
-        return None
+        index = self.index
+        record = (index.series_by_slug if include_drafts else index.published_series_by_slug).get(slug)
+        return index.series_model(record) if record is not None else None
+
+    def list_series(self, include_drafts: bool = False) -> tuple[Series, ...]:
+        index = self.index
+        return tuple(index.series_model(s) for s in (index.series if include_drafts else index.published_series))
     
     @property
-    def posts(self) -> list[Post]:
-        if self._posts is not None:
-            return self._posts
+    def posts(self) -> tuple[PostRecord, ...]:
+        """Compact records of every post, get_post has the full model"""
+        return self.index.posts
 
-        posts_list = []
-        for fname in os.listdir(POSTS_DIR):
-            if not fname.endswith('.md'):
-                continue
-            path = os.path.join(POSTS_DIR, fname)
-            meta, _ = parse_frontmatter(path)
-            if not meta:
-                continue
-            posts_list.append(Post(
-                slug=meta.get('slug', fname[:-3]),
-                file=fname,
-                title=meta.get('title', ''),
-                authors=[Author(name=a) for a in meta.get('authors', [])],
-                created=date.fromisoformat(meta.get('created', '')),
-                updated=date.fromisoformat(meta.get('updated', meta.get('created', ''))),
-                description=meta.get('description', ''),
-                tags=meta.get('tags', []),
-                draft=meta.get('draft', False),
-                featured=meta.get('featured', False),
-                cover_image=meta.get('cover_image', ''),
-                attachments=meta.get('attachments', [])
-            ))
-
-        self._posts = posts_list[:]
-        return posts_list
-    
     @property
-    def series(self) -> list[Series]:
-        if self._series is not None:
-            return self._series
+    def series(self) -> tuple[SeriesRecord, ...]:
+        return self.index.series
 
-        series_list = []
-        for fname in os.listdir(SERIES_DIR):
-            if not fname.endswith('.yaml'):
-                continue
-            path = os.path.join(SERIES_DIR, fname)
-            with open(path, 'r', encoding='utf-8') as f:
-                meta = yaml.safe_load(f)
-            if not meta:
-                continue
+    def _load_post(self, fname: str) -> LoadedPost | None:
+        path = os.path.join(POSTS_DIR, fname)
+        meta, body = parse_frontmatter(path)
+        if not meta:
+            return None
+        record = PostRecord(
+            row=-1,
+            slug=text(meta, 'slug', fname[:-3]),
+            file=fname,
+            title=text(meta, 'title'),
+            authors=names(meta, 'authors'),
+            description=text(meta, 'description'),
+            tags=names(meta, 'tags'),
+            draft=flag(meta, 'draft'),
+            featured=flag(meta, 'featured'),
+            cover_image=text(meta, 'cover_image'),
+            attachments=names(meta, 'attachments')
+        )
+        created = date.fromisoformat(meta.get('created', ''))
+        updated = date.fromisoformat(meta.get('updated', meta.get('created', '')))
+        return LoadedPost(record, created.toordinal(), updated.toordinal(), Counter(tokenize(body)))
 
-            posts_data = meta.get('posts', [])
-            if isinstance(posts_data[0], dict):
-                posts_data.sort(key=lambda p: p.get('order', 0))
-                post_slugs = [p['slug'] for p in posts_data]
-            else:
-                post_slugs = posts_data
-
-            posts = [p for p in self.posts if p.slug in post_slugs]
-            posts.sort(key=lambda p: post_slugs.index(p.slug))
-
-            series_list.append(Series(
-                slug=meta.get('slug', fname[:-5]),
-                title=meta.get('title', ''),
-                description=meta.get('description', ''),
-                authors=[Author(name=a) for a in meta.get('authors', [])],
-                created=date.fromisoformat(meta.get('created', '')),
-                status=meta.get('status', ''),
-                cover_image=meta.get('cover_image', ''),
-                posts=posts
-            ))
-
-        self._series = series_list[:]
-        return series_list
+    def _load_series_meta(self, fname: str) -> dict | None:
+        path = os.path.join(SERIES_DIR, fname)
+        with open(path, 'r', encoding='utf-8') as f:
+            return yaml.load(f, Loader=YAML_LOADER)
+    
+    def _build_series(self, fname: str, meta: dict, posts_by_slug: dict[str, PostRecord]) -> SeriesRecord:
+        # dict.fromkeys drops repeated slugs while keeping series order
+        posts = tuple(posts_by_slug[slug] for slug in dict.fromkeys(series_post_slugs(meta)) if slug in posts_by_slug)
+
+        return SeriesRecord(
+            slug=text(meta, 'slug', fname[:-5]),
+            title=text(meta, 'title'),
+            description=text(meta, 'description'),
+            authors=names(meta, 'authors'),
+            created=date.fromisoformat(meta.get('created', '')),
+            status=text(meta, 'status'),
+            cover_image=text(meta, 'cover_image'),
+            posts=posts
+        )
     
     def get_series_of_post(self, post_slug: str) -> list[Series]:
-        return [s for s in self.series if any(p.slug == post_slug for p in s.posts)]
+        index = self.index
+        return [index.series_model(s) for s in index.series_of_post.get(post_slug, ())]
     
     def get_series_navigation(self, series_slug: str, post_slug: str) -> dict | None:
-        series = self.get_series(series_slug)
-        if not series:
-            return None
-        
-        current_index = None
-        for i, post in enumerate(series.posts):
-            if post.slug == post_slug:
-                current_index = i
-                break
-
-        if current_index is None:
+        index = self.index
+        navigation = index.navigation.get((series_slug, post_slug))
+        if navigation is None:
             return None
-        
-        prev_post = series.posts[current_index - 1] if current_index > 0 else None
-        next_post = series.posts[current_index + 1] if current_index < len(series.posts) - 1 else None
-
         return {
-            'prev': prev_post,
-            'next': next_post,
-            'current_index': current_index + 1,
-            'total': len(series.posts)
+            'prev': index.post_model(navigation.prev) if navigation.prev is not None else None,
+            'next': index.post_model(navigation.next) if navigation.next is not None else None,
+            'current_index': navigation.current_index,
+            'total': navigation.total
         }
 
     def get_latest_posts(self, limit: int = 5, include_drafts: bool = False) -> list[Post]:
-        posts = self.posts
-        if not include_drafts:
-            posts = [p for p in posts if not p.draft]
-        return sorted(posts, key=lambda p: p.created, reverse=True)[:limit]
+        index = self.index
+        return index.post_models((index.latest if include_drafts else index.latest_published)[:limit])
 
     def get_featured_posts(self, limit: int = 5, include_drafts: bool = False) -> list[Post]:
-        posts = self.posts
-        if not include_drafts:
-            posts = [p for p in posts if not p.draft]
-        return [p for p in posts if p.featured][:limit]
+        index = self.index
+        if include_drafts:
+            return index.post_models([p for p in index.posts if p.featured][:limit])
+        return index.post_models(index.featured_published[:limit])
+
+    def get_post_updates(self) -> list[tuple[str, date]]:
+        """(slug, updated) of every published post, newest first, without building models"""
+        index = self.index
+        return [(post.slug, date.fromordinal(index.updated[post.row])) for post in index.latest_published]
+
+    def get_posts_by_tag(self, tag: str) -> list[Post]:
+        index = self.index
+        return index.post_models(index.posts_by_tag.get(tag, ()))
+
+    def get_last_updated(self, series: Series | None = None) -> date | None:
+        """Latest update among published posts, optionally only those of a series"""
+        if series is None:
+            return self.index.last_updated
+        return max((p.updated for p in series.posts), default=series.created)
+
+    def get_tags(self) -> tuple[str, ...]:
+        return self.index.tags
+
+    def get_tag_counts(self) -> Mapping[str, int]:
+        return self.index.tag_counts
+
+    def list_posts(self, tag: str | None = None, page: int = 1, after: str | None = None, size: int = PAGE_SIZE) -> PostPage:
+        """
+        One page of published posts, newest first, optionally with a tag.
+
+        `after` is the slug of the last post already shown; it takes
+        precedence over `page` and keeps pages stable while posts are added.
+        """
+        index = self.index
+        posts = index.latest_published if tag is None else index.posts_by_tag.get(tag, ())
+        offset = (page - 1) * size
+        if after is not None and after in index.rank:
+            # Tag lists keep the global order, so ranks increase along them
+            offset = bisect_right(posts, index.rank[after], key=lambda p: index.rank[p.slug])
+        return PostPage.slice(posts, offset, size, index.post_models)
+
+    def search_posts(self, query: str, tag: str | None = None, page: int = 1, size: int = PAGE_SIZE) -> PostPage:
+        """One page of search results, best match first"""
+        index = self.index
+        hits = index.search.search(query, limit=None)
+        posts = [hit.post for hit in hits if tag is None or tag in hit.post.tags]
+        return PostPage.slice(posts, (page - 1) * size, size, index.post_models)
+
+    def search(self, query: str, limit: int | None = 20, prefix: bool = True) -> list[SearchResult]:
+        """Full-text search over published posts, best match first"""
+        index = self.index
+        hits = index.search.search(query, limit=limit, prefix=prefix)
+        return [SearchResult(post=index.post_model(hit.post), score=hit.score) for hit in hits]
     
-    def render_post_body(self, post: Post) -> str:
+    def post_fingerprint(self, post: Post | PostRecord) -> tuple[str, int, int]:
+        """
+        Fingerprint of the accepted version of the post's file, which keys
+        anything derived from it. A newer file that failed to load does not
+        change it.
+        """
+        entry = self._post_entries.get(post.file)
+        if entry is not None:
+            return (post.slug, *entry[0])
+        stat = os.stat(os.path.join(POSTS_DIR, post.file))
+        return (post.slug, stat.st_mtime_ns, stat.st_size)
+
+    def render_post_body(self, post: Post | PostRecord) -> str:
         post_path = os.path.join(POSTS_DIR, post.file)
-        _, body = parse_frontmatter(post_path)
-        return self._md.convert(body)
+        key = self.post_fingerprint(post)
+
+        html = self._snapshot_html.get(key) or self._pinned_html.get(key) or self._render_cache.get(key)
+        if html is not None:
+            return html
+
+        try:
+            body = read_body(post_path)
+        except (OSError, ValueError) as e:
+            # The file changed since it was accepted and is most likely half-written
+            raise PostUnavailableError(f'{post.file}: {e}') from e
+        with span('render.markdown'):
+            html = self._md_pool.convert(body)
+        self._render_cache.put(key, html)
+        return html
+
+    def render_cache_stats(self) -> dict:
+        return self._render_cache.stats()
@@ -0,0 +1,180 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Protocol
+from .cache import LRUCache
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Token bucket allowing bursts of `capacity` that refills fully every `period` seconds"""
+    capacity: int
+    period: float
+
+    @classmethod
+    def parse(cls, spec: str) -> 'RateLimit | None':
+        """Parse '<count>/<seconds>', empty or '0' disables the limit"""
+        if not spec or spec == '0':
+            return None
+        count, _, seconds = spec.partition('/')
+        limit = cls(capacity=int(count), period=float(seconds or 3600))
+        if limit.capacity < 1 or limit.period <= 0:
+            raise ValueError(f'Invalid rate limit {spec!r}, expected <count>/<seconds> with both positive')
+        return limit
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+class RateLimitStore(Protocol):
+    def take(self, key: str, limit: RateLimit) -> float:
+        """Spend a token, return 0 if allowed or the seconds until one is available"""
+        ...
+
+    def add(self, key: str, ttl: float) -> bool:
+        """Remember a key for ttl seconds, False if it is already remembered"""
+        ...
+
+    def discard(self, key: str) -> None: ...
+
+class MemoryRateLimitStore:
+    """Per-process store, bounded so a flood of distinct clients cannot exhaust memory"""
+
+    def __init__(self, max_keys: int = 10_000):
+        self._buckets: LRUCache[str, tuple[float, float]] = LRUCache(max_keys)
+        self._seen: LRUCache[str, float] = LRUCache(max_keys)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key) or (float(limit.capacity), now)
+            tokens = min(float(limit.capacity), tokens + (now - last) * limit.rate)
+            if tokens >= 1:
+                self._buckets.put(key, (tokens - 1, now))
+                return 0.0
+            self._buckets.put(key, (tokens, now))
+            return (1 - tokens) / limit.rate
+
+    def add(self, key: str, ttl: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            expires = self._seen.get(key)
+            if expires is not None and expires > now:
+                return False
+            self._seen.put(key, now + ttl)
+            return True
+
+    def discard(self, key: str) -> None:
+        self._seen.discard(key)
+
+class SqliteRateLimitStore:
+    """
+    Store in an SQLite file, shared by every worker process on the host.
+
+    Each process and thread opens its own connection and every operation
+    is one immediate transaction, so workers never interleave updates of
+    a bucket. Buckets that refilled and expired keys are pruned as it goes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, and sqlite3 ones not threads either
+        if getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, last REAL, expires REAL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, expires REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS buckets_expires ON buckets (expires)')
+            conn.execute('CREATE INDEX IF NOT EXISTS seen_expires ON seen (expires)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def take(self, key: str, limit: RateLimit) -> float:
+        # Wall clock time, as monotonic clocks are not comparable across processes
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM buckets WHERE expires < ?', (now,))
+            row = conn.execute('SELECT tokens, last FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, last = row or (float(limit.capacity), now)
+            tokens = min(float(limit.capacity), tokens + max(0.0, now - last) * limit.rate)
+            retry_after = 0.0 if tokens >= 1 else (1 - tokens) / limit.rate
+            if tokens >= 1:
+                tokens -= 1
+            # A bucket left alone for a period is full again, the same as no row
+            conn.execute(
+                'INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)',
+                (key, tokens, now, now + limit.period)
+            )
+        return retry_after
+
+    def add(self, key: str, ttl: float) -> bool:
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM seen WHERE expires <= ?', (now,))
+            if conn.execute('SELECT 1 FROM seen WHERE key = ?', (key,)).fetchone() is not None:
+                return False
+            conn.execute('INSERT INTO seen VALUES (?, ?)', (key, now + ttl))
+        return True
+
+    def discard(self, key: str) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM seen WHERE key = ?', (key,))
+
+def fingerprint(*parts: str) -> str:
+    """Hash of the parts with case and whitespace normalized"""
+    normalized = '\0'.join(' '.join(part.lower().split()) for part in parts)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:32]
+
+class ContactThrottle:
+    """
+    Abuse limits for the contact form.
+
+    Each client IP and each message text get a token bucket, the latter
+    catching the same spam sent from many addresses. Resubmitting an
+    identical message within duplicate_ttl is reported as sent without
+    sending it again.
+    """
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        client_limit: RateLimit | None,
+        message_limit: RateLimit | None,
+        duplicate_ttl: float
+    ):
+        self.store = store
+        self.client_limit = client_limit
+        self.message_limit = message_limit
+        self.duplicate_ttl = duplicate_ttl
+
+    def check_client(self, client: str) -> float:
+        if self.client_limit is None:
+            return 0.0
+        return self.store.take(f'client:{client}', self.client_limit)
+
+    def check_message(self, message: str) -> float:
+        if self.message_limit is None:
+            return 0.0
+        return self.store.take(f'message:{fingerprint(message)}', self.message_limit)
+
+    def claim(self, email: str, message: str) -> bool:
+        """Reserve a submission, False if the same one was already sent recently"""
+        if self.duplicate_ttl <= 0:
+            return True
+        return self.store.add(f'submission:{fingerprint(email, message)}', self.duplicate_ttl)
+
+    def release(self, email: str, message: str) -> None:
+        """Forget a claimed submission that could not be sent, so a retry goes through"""
+        self.store.discard(f'submission:{fingerprint(email, message)}')
@@ -0,0 +1,234 @@
+from array import array
+from dataclasses import dataclass, field, replace
+from datetime import date
+from types import MappingProxyType
+from collections import Counter
+from collections.abc import Callable, Mapping, Sequence
+from ..models import Author, Post, PostRecord, Series, SeriesRecord
+from .cache import LRUCache
+from .search_index import SearchIndex
+
+# Pydantic models built for templates, per index
+MODEL_CACHE_MAX_ENTRIES = 1024
+
+@dataclass(frozen=True)
+class SeriesNavigation:
+    prev: PostRecord | None
+    next: PostRecord | None
+    current_index: int
+    total: int
+
+@dataclass(frozen=True)
+class PostPage:
+    posts: tuple[Post, ...]
+    # 1-based, derived from the offset when the page was reached by cursor
+    number: int
+    size: int
+    total: int
+    # Pass as `after` to get the next page, None on the last page
+    next_cursor: str | None
+
+    @classmethod
+    def slice(
+        cls,
+        posts: Sequence[PostRecord],
+        offset: int,
+        size: int,
+        convert: Callable[[Sequence[PostRecord]], list[Post]]
+    ) -> 'PostPage':
+        chunk = posts[offset:offset + size]
+        has_next = bool(chunk) and offset + len(chunk) < len(posts)
+        return cls(
+            posts=tuple(convert(chunk)),
+            number=offset // size + 1,
+            size=size,
+            total=len(posts),
+            next_cursor=chunk[-1].slug if has_next else None
+        )
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.total // self.size))
+
+    @property
+    def has_prev(self) -> bool:
+        return self.number > 1
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+@dataclass(frozen=True)
+class ContentIndex:
+    """
+    Read-only lookup tables over all posts and series, built once per load.
+
+    Posts are kept as compact records with their dates in array columns;
+    the Pydantic models templates expect are only built on the way out,
+    by post_model and series_model.
+    """
+
+    # posts[row].row == row
+    posts: tuple[PostRecord, ...]
+    # Date ordinals by row
+    created: array
+    updated: array
+    series: tuple[SeriesRecord, ...]
+    # Same series with draft posts left out
+    published_series: tuple[SeriesRecord, ...]
+    posts_by_slug: Mapping[str, PostRecord]
+    series_by_slug: Mapping[str, SeriesRecord]
+    published_series_by_slug: Mapping[str, SeriesRecord]
+    # Published series membership, in series listing order
+    series_of_post: Mapping[str, tuple[SeriesRecord, ...]]
+    # (series slug, post slug) -> prev/next over the published posts of the series
+    navigation: Mapping[tuple[str, str], SeriesNavigation]
+    # Newest first
+    latest: tuple[PostRecord, ...]
+    latest_published: tuple[PostRecord, ...]
+    # slug -> position in latest_published, orders posts for cursors
+    rank: Mapping[str, int]
+    featured_published: tuple[PostRecord, ...]
+    # tag -> published posts, newest first
+    posts_by_tag: Mapping[str, tuple[PostRecord, ...]]
+    tags: tuple[str, ...]
+    tag_counts: Mapping[str, int]
+    # Full-text search over published posts
+    search: SearchIndex
+    # Most recent update among published posts
+    last_updated: date | None
+    _post_models: LRUCache[int, Post] = field(init=False, repr=False, compare=False)
+    _series_models: LRUCache[int, Series] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, '_post_models', LRUCache(MODEL_CACHE_MAX_ENTRIES))
+        object.__setattr__(self, '_series_models', LRUCache(MODEL_CACHE_MAX_ENTRIES))
+
+    def __getstate__(self) -> dict:
+        # MappingProxyType cannot be pickled, the snapshot stores plain dicts
+        return {
+            name: dict(value) if isinstance(value, MappingProxyType) else value
+            for name, value in self.__dict__.items()
+            if name not in ('_post_models', '_series_models')
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, MappingProxyType(value) if isinstance(value, dict) else value)
+        self.__post_init__()
+
+    def post_model(self, record: PostRecord) -> Post:
+        post = self._post_models.get(record.row)
+        if post is None:
+            # Built from already validated records, so validation is skipped
+            post = Post.model_construct(
+                slug=record.slug,
+                file=record.file,
+                title=record.title,
+                authors=[Author.model_construct(name=name) for name in record.authors],
+                created=date.fromordinal(self.created[record.row]),
+                updated=date.fromordinal(self.updated[record.row]),
+                description=record.description,
+                tags=list(record.tags),
+                draft=record.draft,
+                featured=record.featured,
+                cover_image=record.cover_image,
+                attachments=list(record.attachments)
+            )
+            self._post_models.put(record.row, post)
+        return post
+
+    def post_models(self, records: Sequence[PostRecord]) -> list[Post]:
+        return [self.post_model(record) for record in records]
+
+    def series_model(self, record: SeriesRecord) -> Series:
+        # Records live as long as the index, so their ids are stable keys
+        series = self._series_models.get(id(record))
+        if series is None:
+            series = Series.model_construct(
+                slug=record.slug,
+                title=record.title,
+                description=record.description,
+                authors=[Author.model_construct(name=name) for name in record.authors],
+                created=record.created,
+                status=record.status,
+                cover_image=record.cover_image,
+                posts=tuple(self.post_models(record.posts))
+            )
+            self._series_models.put(id(record), series)
+        return series
+
+    @classmethod
+    def build(
+        cls,
+        posts: list[PostRecord],
+        created: array,
+        updated: array,
+        series: list[SeriesRecord],
+        body_terms: dict[str, Counter] | None = None
+    ) -> 'ContentIndex':
+        posts_by_slug: dict[str, PostRecord] = {}
+        for post in posts:
+            posts_by_slug.setdefault(post.slug, post)
+
+        published_series = [
+            replace(s, posts=tuple(p for p in s.posts if not p.draft))
+            if any(p.draft for p in s.posts) else s
+            for s in series
+        ]
+
+        series_by_slug: dict[str, SeriesRecord] = {}
+        for s in series:
+            series_by_slug.setdefault(s.slug, s)
+        published_series_by_slug: dict[str, SeriesRecord] = {}
+        for s in published_series:
+            published_series_by_slug.setdefault(s.slug, s)
+
+        series_of_post: dict[str, list[SeriesRecord]] = {}
+        navigation: dict[tuple[str, str], SeriesNavigation] = {}
+        for s in published_series:
+            published = s.posts
+            total = len(published)
+            for i, post in enumerate(published):
+                series_of_post.setdefault(post.slug, []).append(s)
+                navigation.setdefault((s.slug, post.slug), SeriesNavigation(
+                    prev=published[i - 1] if i > 0 else None,
+                    next=published[i + 1] if i < total - 1 else None,
+                    current_index=i + 1,
+                    total=total
+                ))
+
+        latest = tuple(sorted(posts, key=lambda p: created[p.row], reverse=True))
+        latest_published = tuple(p for p in latest if not p.draft)
+        rank: dict[str, int] = {}
+        for i, post in enumerate(latest_published):
+            rank.setdefault(post.slug, i)
+
+        posts_by_tag: dict[str, list[PostRecord]] = {}
+        for post in latest_published:
+            for tag in post.tags:
+                bucket = posts_by_tag.setdefault(tag, [])
+                if not bucket or bucket[-1] is not post:
+                    bucket.append(post)
+
+        return cls(
+            posts=tuple(posts),
+            created=created,
+            updated=updated,
+            series=tuple(series),
+            published_series=tuple(published_series),
+            posts_by_slug=MappingProxyType(posts_by_slug),
+            series_by_slug=MappingProxyType(series_by_slug),
+            published_series_by_slug=MappingProxyType(published_series_by_slug),
+            series_of_post=MappingProxyType({k: tuple(v) for k, v in series_of_post.items()}),
+            navigation=MappingProxyType(navigation),
+            latest=latest,
+            latest_published=latest_published,
+            rank=MappingProxyType(rank),
+            featured_published=tuple(p for p in posts if p.featured and not p.draft),
+            posts_by_tag=MappingProxyType({k: tuple(v) for k, v in posts_by_tag.items()}),
+            tags=tuple(sorted(posts_by_tag)),
+            tag_counts=MappingProxyType({k: len(v) for k, v in posts_by_tag.items()}),
+            search=SearchIndex(list(latest_published), body_terms or {}),
+            last_updated=date.fromordinal(max(updated[p.row] for p in latest_published)) if latest_published else None
+        )
@@ -0,0 +1,42 @@
+import logging
+import mmap
+import os
+import pickle
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'BLOGSNAP'
+# Bump whenever the pickled structures change shape
+SNAPSHOT_FORMAT = 3
+
+def write_snapshot(path: str, data: dict) -> int:
+    """Atomically write data as a snapshot file and return its size in bytes"""
+    payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    header = SNAPSHOT_MAGIC + SNAPSHOT_FORMAT.to_bytes(4, 'little')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return len(header) + len(payload)
+
+def read_snapshot(path: str) -> dict | None:
+    """Load a snapshot through a memory map, None if it is missing or from another format"""
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_size = len(SNAPSHOT_MAGIC) + 4
+            if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                logger.warning(f'Ignoring {path}: not a content snapshot')
+                return None
+            if int.from_bytes(mm[len(SNAPSHOT_MAGIC):header_size], 'little') != SNAPSHOT_FORMAT:
+                logger.info(f'Ignoring {path}: built by a different version')
+                return None
+            with memoryview(mm) as view:
+                return pickle.loads(view[header_size:])
+    except FileNotFoundError:
+        return None
+    except (ValueError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        # Empty or truncated file, or classes that moved since it was built
+        logger.warning(f'Ignoring unreadable content snapshot {path}: {e}')
+        return None
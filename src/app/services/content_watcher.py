@@ -0,0 +1,45 @@
+import logging
+import threading
+from collections.abc import Sequence
+from typing import Protocol
+
+logger = logging.getLogger(__name__)
+
+class Reloadable(Protocol):
+    def reload(self) -> bool: ...
+
+class ContentWatcher:
+    """Polls the content tree in a background thread and hot-swaps what changed"""
+
+    def __init__(self, sources: Sequence[Reloadable], interval: float):
+        self.sources = sources
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='content-watcher', daemon=True)
+        self._thread.start()
+        logger.info(f'Watching content for changes every {self.interval}s')
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            for source in self.sources:
+                try:
+                    source.reload()
+                except Exception:
+                    logger.exception(f'Reloading {type(source).__name__} failed')
@@ -0,0 +1,233 @@
+import email
+import fcntl
+import heapq
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from email import policy
+from email.message import EmailMessage
+from .email_service import SMTP_IDLE_TIMEOUT, EmailService
+
+logger = logging.getLogger(__name__)
+
+EMAIL_MAX_ATTEMPTS = 6
+# Retries after 2, 4, 8, 16 and 32 seconds
+EMAIL_RETRY_BASE_DELAY = 2.0
+EMAIL_RETRY_MAX_DELAY = 300.0
+# Unlocked partial spool files older than this are left by a dead process
+SPOOL_TMP_MAX_AGE = 60.0
+
+class EmailQueueFull(Exception):
+    pass
+
+@dataclass(order=True)
+class EmailJob:
+    due: float
+    id: str = field(compare=False)
+    message: EmailMessage = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+
+def is_permanent(error: Exception) -> bool:
+    """Whether retrying cannot help, e.g. a 5xx reply or refused recipients"""
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPAuthenticationError)):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+def try_lock(fd: int) -> bool:
+    """Take an exclusive lock on an open file without waiting, False if another process holds one"""
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+def is_open_at(fd: int, path: str) -> bool:
+    try:
+        return os.path.samestat(os.fstat(fd), os.stat(path))
+    except FileNotFoundError:
+        return False
+
+class EmailQueue:
+    """
+    Delivers email from a bounded in-process queue on a background thread.
+
+    Failed sends are retried with exponential backoff. With a spool
+    directory every accepted message is also written to disk until it is
+    delivered, so messages survive a restart; ones that fail permanently
+    are moved to spool/failed for inspection.
+
+    Each process holds a lock on the spool files it is delivering. Locks
+    are released when a process dies, so on start the files nobody holds
+    one on are the orphans to resume, whatever became of their pids.
+    """
+
+    def __init__(
+        self,
+        email_service: EmailService,
+        max_size: int = 100,
+        spool_dir: str | None = None,
+        max_attempts: int = EMAIL_MAX_ATTEMPTS,
+        retry_base_delay: float = EMAIL_RETRY_BASE_DELAY
+    ):
+        self.email_service = email_service
+        self.spool_dir = spool_dir
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self._queue: queue.Queue[EmailJob] = queue.Queue(maxsize=max_size)
+        # Jobs waiting for their retry, only touched by the worker thread
+        self._retries: list[EmailJob] = []
+        # job id -> descriptor of its spool file, holding the lock on it
+        self._spool_locks: dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.sent = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._retries)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        if self.spool_dir:
+            os.makedirs(os.path.join(self.spool_dir, 'failed'), exist_ok=True)
+            self._retries.extend(self._load_spool())
+            heapq.heapify(self._retries)
+            if self._retries:
+                logger.info(f'Resuming {len(self._retries)} spooled emails')
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='email-queue', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.email_service.close()
+        if self.pending:
+            where = 'kept in the spool' if self.spool_dir else 'dropped'
+            logger.warning(f'{self.pending} undelivered emails {where} on shutdown')
+
+    def submit(self, content: str, subject: str = "New contact form submission") -> str:
+        """Queue a message for delivery and return its id, raising EmailQueueFull if there is no room"""
+        job = EmailJob(due=time.monotonic(), id=uuid.uuid4().hex, message=self.email_service.build_message(content, subject))
+        if self.spool_dir:
+            self._write_spool(job)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._remove_spool(job)
+            raise EmailQueueFull(f'Email queue is full ({self._queue.maxsize} messages)')
+        return job.id
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if self._retries and self._retries[0].due <= now:
+                self._attempt(heapq.heappop(self._retries))
+                continue
+            timeout = min(self._retries[0].due - now, 1.0) if self._retries else 1.0
+            try:
+                job = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self.email_service.close_idle(SMTP_IDLE_TIMEOUT)
+                continue
+            self._attempt(job)
+
+    def _attempt(self, job: EmailJob) -> None:
+        job.attempts += 1
+        try:
+            self.email_service.deliver(job.message)
+        except Exception as e:
+            if is_permanent(e) or job.attempts >= self.max_attempts:
+                self.failed += 1
+                logger.error(f'Giving up on email {job.id} after {job.attempts} attempts: {e}')
+                self._remove_spool(job, failed=True)
+                return
+            delay = min(self.retry_base_delay * 2 ** (job.attempts - 1), EMAIL_RETRY_MAX_DELAY)
+            logger.warning(f'Sending email {job.id} failed (attempt {job.attempts}), retrying in {delay:g}s: {e}')
+            job.due = time.monotonic() + delay
+            heapq.heappush(self._retries, job)
+            return
+        self.sent += 1
+        self._remove_spool(job)
+        logger.info(f'Sent email {job.id}')
+
+    def _spool_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, f'{job_id}.eml')
+
+    def _write_spool(self, job: EmailJob) -> None:
+        path = self._spool_path(job.id)
+        fd = os.open(path + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            # Locked before it has a name another process would resume
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), 'wb') as f:
+                f.write(job.message.as_bytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + '.tmp', path)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._spool_locks[job.id] = fd
+
+    def _remove_spool(self, job: EmailJob, failed: bool = False) -> None:
+        if not self.spool_dir:
+            return
+        path = self._spool_path(job.id)
+        try:
+            if failed:
+                os.replace(path, os.path.join(self.spool_dir, 'failed', os.path.basename(path)))
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+        # Only unlocked once the file is gone, so no other process can resume it
+        fd = self._spool_locks.pop(job.id, None)
+        if fd is not None:
+            os.close(fd)
+
+    def _load_spool(self) -> list[EmailJob]:
+        """Claim the spooled messages of dead processes and remove their partial writes"""
+        jobs = []
+        now = time.monotonic()
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(('.eml', '.eml.tmp')):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            # Locked by the live process delivering it, or deleted by its owner
+            # between our open and lock
+            if not try_lock(fd) or not is_open_at(fd, path):
+                os.close(fd)
+                continue
+            if name.endswith('.tmp'):
+                # A fresh one may still be waiting for its writer to lock it
+                if time.time() - os.fstat(fd).st_mtime < SPOOL_TMP_MAX_AGE:
+                    os.close(fd)
+                    continue
+                logger.info(f'Removing partially spooled email {name}')
+                os.remove(path)
+                os.close(fd)
+                continue
+            # Older spools named files <id>.<pid>.eml
+            job_id = name.split('.')[0]
+            if path != self._spool_path(job_id):
+                os.replace(path, self._spool_path(job_id))
+            with os.fdopen(os.dup(fd), 'rb') as f:
+                message = email.message_from_binary_file(f, policy=policy.default)
+            self._spool_locks[job_id] = fd
+            jobs.append(EmailJob(due=now, id=job_id, message=message))
+        return jobs
@@ -1,38 +1,125 @@
+import logging
 import smtplib
+import threading
+import time
 from email.message import EmailMessage
 from email.utils import formatdate, make_msgid
+from ..metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# An idle connection is probed with NOOP before reuse, and closed after a while
+SMTP_KEEPALIVE = 30.0
+SMTP_IDLE_TIMEOUT = 120.0
 
 class EmailService:
-    def __init__(self, to_address: str, smtp_username: str, smtp_password: str, smtp_host: str, smtp_port: int):
+    def __init__(
+        self,
+        to_address: str,
+        smtp_username: str,
+        smtp_password: str,
+        smtp_host: str,
+        smtp_port: int,
+        starttls: bool = True,
+        timeout: float = 10.0
+    ):
         self.to_address = to_address
         self.smtp_username = smtp_username
         self.smtp_password = smtp_password
         self.smtp_host = smtp_host
         self.smtp_port = smtp_port
-        
+        self.starttls = starttls
+        self.timeout = timeout
+        self._smtp: smtplib.SMTP | None = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
         # Validate required configuration
         if not all([to_address, smtp_username, smtp_password, smtp_host, smtp_port]):
             raise ValueError("All SMTP configuration parameters are required")
 
+    def build_message(self, content: str, subject: str = "New contact form submission") -> EmailMessage:
+        msg = EmailMessage()
+        msg['Subject'] = subject
+        msg['From'] = self.smtp_username
+        msg['To'] = self.to_address
+        msg['Date'] = formatdate(localtime=True)
+        msg['Message-ID'] = make_msgid()
+        msg.set_content(content)
+        return msg
+
     def send_email(self, content: str, subject: str = "New contact form submission"):
         """Synchronous email sending - runs in thread pool"""
         try:
-            # Create email message
-            msg = EmailMessage()
-            msg['Subject'] = subject
-            msg['From'] = self.smtp_username
-            msg['To'] = self.to_address
-            msg['Date'] = formatdate(localtime=True)
-            msg['Message-ID'] = make_msgid()
-            msg.set_content(content)
-
-            # Connect and send
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as smtp:
-                smtp.starttls()  # Enable TLS encryption
-                smtp.login(self.smtp_username, self.smtp_password)
-                smtp.send_message(msg)
-                
+            self.deliver(self.build_message(content, subject))
         except smtplib.SMTPException as e:
             raise RuntimeError(f"SMTP error: {e}")
         except Exception as e:
             raise RuntimeError(f"Email sending failed: {e}")
+
+    @timed('smtp.send')
+    def deliver(self, msg: EmailMessage) -> None:
+        """Send over the shared connection, reconnecting once if it went stale"""
+        with self._lock:
+            reused = self._smtp is not None
+            smtp = self._connection()
+            try:
+                smtp.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self._close()
+                if not reused:
+                    raise
+                logger.info('SMTP connection dropped, reconnecting')
+                smtp = self._connection()
+                smtp.send_message(msg)
+            except smtplib.SMTPResponseException as e:
+                # The session is still usable after a rejected message
+                if e.smtp_code in (421, -1):
+                    self._close()
+                raise
+            except smtplib.SMTPException:
+                raise
+            except OSError:
+                # Timed out mid-transaction, the session state is unknown
+                self._close()
+                raise
+            self._last_used = time.monotonic()
+
+    def close_idle(self, max_idle: float = SMTP_IDLE_TIMEOUT) -> None:
+        with self._lock:
+            if self._smtp is not None and time.monotonic() - self._last_used > max_idle:
+                self._close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is not None and time.monotonic() - self._last_used > SMTP_KEEPALIVE:
+            try:
+                if self._smtp.noop()[0] != 250:
+                    self._close()
+            except (smtplib.SMTPException, OSError):
+                self._close()
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=self.timeout)
+            try:
+                if self.starttls:
+                    smtp.starttls()  # Enable TLS encryption
+                smtp.login(self.smtp_username, self.smtp_password)
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self._last_used = time.monotonic()
+            logger.info(f'Connected to SMTP server {self.smtp_host}:{self.smtp_port}')
+        return self._smtp
+
+    def _close(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
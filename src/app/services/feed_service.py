@@ -0,0 +1,203 @@
+import hashlib
+from collections.abc import Callable, Collection, Hashable, Iterable, Iterator
+from dataclasses import dataclass
+from datetime import date, datetime, time, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape, quoteattr
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from ..models import Post
+from .blog_service import BlogService
+from .cache import LRUCache
+from .response_cache import RESPONSE_CACHE_HOSTS, CachedResponse, is_known_host, to_datetime
+
+FEED_TITLE = 'Emil\'s Blog'
+FEED_ENTRIES = 20
+# Entries are coalesced into chunks of about this size for streaming
+FEED_CHUNK_SIZE = 64 * 1024
+FEED_ENTRY_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+ATOM_MEDIA_TYPE = 'application/atom+xml; charset=utf-8'
+RSS_MEDIA_TYPE = 'application/rss+xml; charset=utf-8'
+SITEMAP_MEDIA_TYPE = 'application/xml; charset=utf-8'
+
+def atom_date(value: date) -> str:
+    return f'{value.isoformat()}T00:00:00Z'
+
+def rss_date(value: date) -> str:
+    return format_datetime(datetime.combine(value, time.min, tzinfo=timezone.utc), usegmt=True)
+
+@dataclass(frozen=True)
+class CachedFeed(CachedResponse):
+    chunks: tuple[bytes, ...]
+    media_type: str
+
+    @classmethod
+    def create(cls, parts: Iterable[str], media_type: str, last_modified: date | None = None) -> 'CachedFeed':
+        digest = hashlib.sha256()
+        chunks = []
+        pending: list[bytes] = []
+        pending_size = 0
+        for part in parts:
+            data = part.encode('utf-8')
+            digest.update(data)
+            pending.append(data)
+            pending_size += len(data)
+            if pending_size >= FEED_CHUNK_SIZE:
+                chunks.append(b''.join(pending))
+                pending, pending_size = [], 0
+        if pending:
+            chunks.append(b''.join(pending))
+        return cls(
+            chunks=tuple(chunks),
+            media_type=media_type,
+            etag='"' + digest.hexdigest()[:32] + '"',
+            last_modified=to_datetime(last_modified)
+        )
+
+    def to_response(self, request: Request) -> Response:
+        if self.is_fresh(request):
+            return Response(status_code=304, headers=self.headers())
+        headers = self.headers()
+        headers['Content-Length'] = str(sum(len(chunk) for chunk in self.chunks))
+        return StreamingResponse(iter(self.chunks), media_type=self.media_type, headers=headers)
+
+class FeedService:
+    """
+    Atom and RSS feeds of the latest posts and a sitemap of every page.
+
+    Each document is generated once per content version and base URL.
+    Feed entries, which carry the rendered post bodies, are also cached by
+    the post's file, so a new version only re-renders the posts that changed.
+    Feeds are only served for known hosts, as their links are absolute.
+    """
+
+    def __init__(
+        self,
+        blog_service: BlogService,
+        hosts: Collection[str] = RESPONSE_CACHE_HOSTS,
+        title: str = FEED_TITLE,
+        entries: int = FEED_ENTRIES
+    ):
+        self.blog_service = blog_service
+        self.hosts = frozenset(hosts)
+        self.title = title
+        self.entries = entries
+        self._documents: LRUCache[Hashable, CachedFeed] = LRUCache(16)
+        self._entries: LRUCache[Hashable, str] = LRUCache(
+            4096,
+            max_weight=FEED_ENTRY_CACHE_MAX_BYTES,
+            weigh=len
+        )
+        self._generators: dict[str, tuple[Callable[[str], Iterator[str]], str]] = {
+            'atom': (self.atom, ATOM_MEDIA_TYPE),
+            'rss': (self.rss, RSS_MEDIA_TYPE),
+            'sitemap': (self.sitemap, SITEMAP_MEDIA_TYPE),
+        }
+
+    def serves(self, request: Request) -> bool:
+        return is_known_host(request, self.hosts)
+
+    def get(self, kind: str, base_url: str) -> CachedFeed:
+        """The 'atom', 'rss' or 'sitemap' document for a site served at base_url"""
+        base_url = base_url.rstrip('/')
+        key = (kind, self.blog_service.version, base_url)
+        feed = self._documents.get(key)
+        if feed is None:
+            generate, media_type = self._generators[kind]
+            feed = CachedFeed.create(generate(base_url), media_type, self.blog_service.get_last_updated())
+            self._documents.put(key, feed)
+        return feed
+
+    def stats(self) -> dict[str, dict]:
+        return {'feed': self._documents.stats(), 'feed_entry': self._entries.stats()}
+
+    def _entry(self, kind: str, base_url: str, post: Post, render: Callable[[str, Post], str]) -> str:
+        key = (kind, base_url, self.blog_service.post_fingerprint(post))
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = render(base_url, post)
+            self._entries.put(key, entry)
+        return entry
+
+    def atom(self, base_url: str) -> Iterator[str]:
+        updated = self.blog_service.get_last_updated()
+        yield '<?xml version="1.0" encoding="utf-8"?>\n'
+        yield f'<feed xmlns="http://www.w3.org/2005/Atom" xml:base={quoteattr(base_url + "/")}>\n'
+        yield f'<title>{escape(self.title)}</title>\n'
+        yield f'<id>{escape(base_url)}/blog</id>\n'
+        yield f'<link href={quoteattr(base_url + "/atom.xml")} rel="self" type="application/atom+xml"/>\n'
+        yield f'<link href={quoteattr(base_url + "/blog")} rel="alternate" type="text/html"/>\n'
+        if updated is not None:
+            yield f'<updated>{atom_date(updated)}</updated>\n'
+        for post in self.blog_service.get_latest_posts(limit=self.entries):
+            yield self._entry('atom', base_url, post, self._atom_entry)
+        yield '</feed>\n'
+
+    def _atom_entry(self, base_url: str, post: Post) -> str:
+        url = f'{base_url}/blog/p/{post.slug}'
+        parts = [
+            '<entry>\n',
+            f'<title>{escape(post.title)}</title>\n',
+            f'<id>{escape(url)}</id>\n',
+            f'<link href={quoteattr(url)} rel="alternate" type="text/html"/>\n',
+            f'<published>{atom_date(post.created)}</published>\n',
+            f'<updated>{atom_date(post.updated)}</updated>\n',
+        ]
+        # Atom needs an author, fall back to the feed title for posts without one
+        for name in [author.name for author in post.authors] or [self.title]:
+            parts.append(f'<author><name>{escape(name)}</name></author>\n')
+        for tag in post.tags:
+            parts.append(f'<category term={quoteattr(tag)}/>\n')
+        if post.description:
+            parts.append(f'<summary>{escape(post.description)}</summary>\n')
+        parts.append(f'<content type="html">{escape(self.blog_service.render_post_body(post))}</content>\n')
+        parts.append('</entry>\n')
+        return ''.join(parts)
+
+    def rss(self, base_url: str) -> Iterator[str]:
+        updated = self.blog_service.get_last_updated()
+        yield '<?xml version="1.0" encoding="utf-8"?>\n'
+        yield '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">\n<channel>\n'
+        yield f'<title>{escape(self.title)}</title>\n'
+        yield f'<link>{escape(base_url)}/blog</link>\n'
+        yield f'<description>{escape(self.title)}</description>\n'
+        yield f'<atom:link href={quoteattr(base_url + "/feed.xml")} rel="self" type="application/rss+xml"/>\n'
+        if updated is not None:
+            yield f'<lastBuildDate>{rss_date(updated)}</lastBuildDate>\n'
+        for post in self.blog_service.get_latest_posts(limit=self.entries):
+            yield self._entry('rss', base_url, post, self._rss_item)
+        yield '</channel>\n</rss>\n'
+
+    def _rss_item(self, base_url: str, post: Post) -> str:
+        url = f'{base_url}/blog/p/{post.slug}'
+        parts = [
+            '<item>\n',
+            f'<title>{escape(post.title)}</title>\n',
+            f'<link>{escape(url)}</link>\n',
+            f'<guid isPermaLink="true">{escape(url)}</guid>\n',
+            f'<pubDate>{rss_date(post.created)}</pubDate>\n',
+        ]
+        for tag in post.tags:
+            parts.append(f'<category>{escape(tag)}</category>\n')
+        parts.append(f'<description>{escape(self.blog_service.render_post_body(post))}</description>\n')
+        parts.append('</item>\n')
+        return ''.join(parts)
+
+    def sitemap(self, base_url: str) -> Iterator[str]:
+        def url(path: str, lastmod: date | None = None) -> str:
+            lastmod_tag = f'<lastmod>{lastmod.isoformat()}</lastmod>' if lastmod is not None else ''
+            return f'<url><loc>{escape(base_url + path)}</loc>{lastmod_tag}</url>\n'
+
+        updated = self.blog_service.get_last_updated()
+        yield '<?xml version="1.0" encoding="utf-8"?>\n'
+        yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        yield url('/', updated)
+        yield url('/about')
+        yield url('/contact')
+        yield url('/blog', updated)
+        for series in self.blog_service.list_series():
+            yield url(f'/blog/s/{series.slug}', self.blog_service.get_last_updated(series))
+        for slug, post_updated in self.blog_service.get_post_updates():
+            yield url(f'/blog/p/{slug}', post_updated)
+        yield '</urlset>\n'
@@ -0,0 +1,76 @@
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from functools import partial
+from ..metrics import timed
+from .blog_service import CONTENT_DIR, scan_dir
+from .highlight_cache import HighlightCache
+from .markdown_pool import MarkdownPool, create_fragment_markdown
+
+logger = logging.getLogger(__name__)
+
+HOME_DIR = os.path.join(CONTENT_DIR, 'home')
+
+class FragmentService:
+    """Markdown fragments of the home, about and contact pages, rendered once per file change"""
+
+    def __init__(self, directory: str = HOME_DIR, highlight_cache: HighlightCache | None = None):
+        self.directory = directory
+        self._version = 0
+        self._lock = threading.Lock()
+        self._md_pool = MarkdownPool(partial(create_fragment_markdown, highlight_cache), max_idle=1)
+        # name (without .md) -> (fingerprint, rendered html)
+        self._fragments: dict[str, tuple[tuple[int, int], str]] = {}
+        self._fingerprints: dict[str, tuple[int, int]] | None = None
+
+    @property
+    def version(self) -> int:
+        """Incremented every time a fragment is added, changed or removed"""
+        return self._version
+
+    def load(self) -> None:
+        if self._fingerprints is None:
+            self.reload()
+
+    @timed('content.fragments')
+    def reload(self) -> bool:
+        """Re-render fragments whose file changed; returns whether any did"""
+        with self._lock:
+            files = scan_dir(self.directory, '.md')
+            if files == self._fingerprints:
+                return False
+
+            fragments = {}
+            for fname, fingerprint in files.items():
+                name = fname[:-3]
+                old = self._fragments.get(name)
+                if old is not None and old[0] == fingerprint:
+                    fragments[name] = old
+                    continue
+                with open(os.path.join(self.directory, fname), 'r', encoding='utf-8') as f:
+                    fragments[name] = (fingerprint, self._md_pool.convert(f.read()))
+
+            # Swap the whole dict so readers never see a partial update
+            self._fragments = fragments
+            self._fingerprints = files
+            self._version += 1
+
+        logger.info(f'Home fragments v{self._version}: {", ".join(sorted(fragments))}')
+        return True
+
+    def modified(self, name: str) -> datetime:
+        """When a fragment's file last changed, in whole seconds"""
+        self.load()
+        entry = self._fragments.get(name)
+        if entry is None:
+            raise KeyError(f'No content fragment named {name!r} in {self.directory}')
+        mtime_ns = entry[0][0]
+        return datetime.fromtimestamp(mtime_ns // 1_000_000_000, tz=timezone.utc)
+
+    def get(self, name: str) -> str:
+        self.load()
+        entry = self._fragments.get(name)
+        if entry is None:
+            raise KeyError(f'No content fragment named {name!r} in {self.directory}')
+        return entry[1]
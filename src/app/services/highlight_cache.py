@@ -0,0 +1,213 @@
+import functools
+import hashlib
+import logging
+import os
+import threading
+import time
+import types
+import pygments
+from markdown import Markdown
+from markdown.extensions.codehilite import CodeHilite, CodeHiliteExtension, HiliteTreeprocessor
+from markdown.extensions.fenced_code import FencedBlockPreprocessor, FencedCodeExtension
+from ..metrics import span
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+HIGHLIGHT_CACHE_MAX_ENTRIES = 4096
+HIGHLIGHT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+# The on-disk store is pruned back to this size, least recently used first
+HIGHLIGHT_STORE_MAX_BYTES = 64 * 1024 * 1024
+HIGHLIGHT_STORE_PRUNE_EVERY = 256
+
+def block_key(block: CodeHilite, shebang: bool) -> str:
+    """Hash of everything that affects how a code block is highlighted"""
+    formatter = block.pygments_formatter
+    parts = (
+        pygments.__version__,
+        block.lang or '',
+        str(block.guess_lang),
+        str(block.use_pygments),
+        block.lang_prefix,
+        formatter if isinstance(formatter, str) else f'{formatter.__module__}.{formatter.__qualname__}',
+        repr(sorted(block.options.items())),
+        str(shebang),
+        block.src,
+    )
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+class HighlightCache:
+    """
+    Highlighted HTML of code blocks keyed by their language, options and
+    source, shared by the Markdown converters given HighlightExtension.
+
+    Editing a post only re-highlights the blocks that changed. With a
+    store directory blocks are also kept on disk across restarts, pruned
+    back to store_max_bytes by last use; a new Pygments version uses new keys.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = HIGHLIGHT_CACHE_MAX_ENTRIES,
+        max_bytes: int = HIGHLIGHT_CACHE_MAX_BYTES,
+        store_dir: str | None = None,
+        store_max_bytes: int = HIGHLIGHT_STORE_MAX_BYTES
+    ):
+        self.store_dir = store_dir
+        self.store_max_bytes = store_max_bytes
+        self._blocks: LRUCache[str, str] = LRUCache(max_entries, max_weight=max_bytes, weigh=len)
+        self._writes = 0
+        self.disk_hits = 0
+
+    def hilite(self, block: 'CachedCodeHilite', shebang: bool = True) -> str:
+        key = block_key(block, shebang)
+        html = self._blocks.get(key)
+        if html is not None:
+            return html
+        html = self._read(key)
+        if html is None:
+            html = block.highlight(shebang)
+            self._write(key, html)
+        else:
+            self.disk_hits += 1
+        self._blocks.put(key, html)
+        return html
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.store_dir, key[:2], f'{key}.html')
+
+    def _read(self, key: str) -> str | None:
+        if not self.store_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                html = f.read()
+            # The modification time orders blocks for pruning
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return html
+
+    def _write(self, key: str, html: str) -> None:
+        if not self.store_dir:
+            return
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # The store is only an optimization
+            logger.warning(f'Could not store highlighted block {key}: {e}')
+        self._writes += 1
+        if self._writes % HIGHLIGHT_STORE_PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete the least recently used stored blocks above store_max_bytes, returning how many"""
+        if not self.store_dir or not os.path.isdir(self.store_dir):
+            return 0
+        files = []
+        removed = 0
+        stale = time.time() - 3600
+        for directory, _, names in os.walk(self.store_dir):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                    # Temp files of writers that died, live ones are renamed within moments
+                    if name.endswith('.tmp'):
+                        if stat.st_mtime < stale:
+                            os.remove(path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.store_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f'Pruned {removed} highlighted blocks from {self.store_dir}')
+        return removed
+
+    def stats(self) -> dict:
+        return {**self._blocks.stats(), 'disk_hits': self.disk_hits}
+
+class CachedCodeHilite(CodeHilite):
+    """
+    CodeHilite looking blocks up in a HighlightCache, if there is one,
+    and timing the highlighting of the ones it has to run through Pygments.
+    """
+
+    def __init__(self, src: str, cache: HighlightCache | None = None, **options):
+        super().__init__(src, **options)
+        self.cache = cache
+
+    def hilite(self, shebang: bool = True) -> str:
+        if self.cache is not None:
+            return self.cache.hilite(self, shebang)
+        return self.highlight(shebang)
+
+    def highlight(self, shebang: bool = True) -> str:
+        """Highlight without the cache"""
+        with span('render.pygments'):
+            return super().hilite(shebang)
+
+def with_code_hilite(method, code_hilite) -> types.FunctionType:
+    """
+    A copy of a Markdown processor method that creates code_hilite where the
+    original creates CodeHilite, so only converters with the extension are
+    affected and no copy of the processor's code is needed.
+    """
+    return types.FunctionType(
+        method.__code__,
+        {**method.__globals__, 'CodeHilite': code_hilite},
+        method.__name__,
+        method.__defaults__,
+        method.__closure__
+    )
+
+class HighlightExtension(CodeHiliteExtension):
+    """
+    codehilite and fenced_code in one extension, with every code block
+    highlighted through a CachedCodeHilite. Takes codehilite's options and
+    replaces both extensions in the list.
+    """
+
+    def __init__(self, cache: HighlightCache | None = None, **kwargs):
+        # Not a config option, those are passed on to Pygments
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md: Markdown) -> None:
+        super().extendMarkdown(md)
+        FencedCodeExtension().extendMarkdown(md)
+        code_hilite = functools.partial(CachedCodeHilite, cache=self.cache)
+        hiliter = md.treeprocessors['hilite']
+        hiliter.run = types.MethodType(with_code_hilite(HiliteTreeprocessor.run, code_hilite), hiliter)
+        fenced = md.preprocessors['fenced_code_block']
+        fenced.run = types.MethodType(with_code_hilite(FencedBlockPreprocessor.run, code_hilite), fenced)
+
+def preload_lexers(names: list[str]) -> list[str]:
+    """Import the lexer modules of the given languages, returning the ones that were found"""
+    loaded = []
+    for name in names:
+        try:
+            get_lexer_by_name(name)
+        except ClassNotFound:
+            logger.warning(f'No Pygments lexer for {name!r}')
+            continue
+        loaded.append(name)
+    return loaded
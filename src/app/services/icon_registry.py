@@ -0,0 +1,77 @@
+import logging
+import os
+import re
+from ..metrics import timed
+
+logger = logging.getLogger(__name__)
+
+ICONS_DIR = os.path.join(os.path.dirname(__file__), '../../../static/icons')
+
+# Remove existing width/height attributes to allow CSS control
+SIZE_ATTR_RE = re.compile(r'\s*(?:width|height)="[^"]*"')
+# Automatically convert common fill colors to currentColor
+FILL_RE = re.compile(r'fill="(?:#000|#000000|black|#333|#333333)"')
+SVG_RE = re.compile(r'<svg([^>]*)>(.*)</svg>', re.DOTALL)
+VIEWBOX_RE = re.compile(r'viewBox="([^"]*)"')
+
+def normalize_svg(content: str) -> str:
+    content = SIZE_ATTR_RE.sub('', content)
+    return FILL_RE.sub('fill="currentColor"', content)
+
+class IconRegistry:
+    """
+    Every SVG in static/icons, normalized once at startup.
+
+    In sprite mode icons render as <use> references into a single hidden
+    sprite, so each page carries every icon's path data only once.
+    """
+
+    def __init__(self, directory: str = ICONS_DIR, sprite: bool = False):
+        self.directory = directory
+        self.sprite_mode = sprite
+        self._icons: dict[str, str] = {}
+        self._references: dict[str, str] = {}
+        self._sprite = ''
+        self.load()
+
+    @timed('icons.load')
+    def load(self) -> None:
+        icons = {}
+        for fname in sorted(os.listdir(self.directory)):
+            if not fname.endswith('.svg'):
+                continue
+            with open(os.path.join(self.directory, fname), 'r', encoding='utf-8') as f:
+                icons[fname[:-4]] = normalize_svg(f.read())
+
+        references = {}
+        symbols = []
+        for name, svg in icons.items():
+            match = SVG_RE.search(svg)
+            if match is None:
+                # Not something we can turn into a symbol, inline it as is
+                references[name] = svg
+                continue
+            attrs, inner = match.groups()
+            viewbox = VIEWBOX_RE.search(attrs)
+            viewbox_attr = f' viewBox="{viewbox.group(1)}"' if viewbox else ''
+            symbols.append(f'<symbol id="icon-{name}"{viewbox_attr}>{inner}</symbol>')
+            references[name] = f'<svg{attrs}><use href="#icon-{name}"/></svg>'
+
+        self._icons = icons
+        self._references = references
+        self._sprite = (
+            '<svg xmlns="http://www.w3.org/2000/svg" style="display: none;">' + ''.join(symbols) + '</svg>'
+            if symbols else ''
+        )
+        logger.info(f'Loaded {len(icons)} icons from {self.directory}')
+
+    def get(self, name: str) -> str:
+        icons = self._references if self.sprite_mode else self._icons
+        svg = icons.get(name)
+        if svg is None:
+            return f'<!-- SVG not found: {name} -->'
+        return svg
+
+    def sprite(self) -> str:
+        """Hidden sprite sheet to place once per page, empty unless in sprite mode"""
+        return self._sprite if self.sprite_mode else ''
@@ -0,0 +1,161 @@
+import hashlib
+import logging
+import os
+import stat
+import threading
+from dataclasses import dataclass
+from .cache import LRUCache
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '../../../static'))
+IMAGE_CACHE_DIR = os.path.normpath(os.getenv(
+    'IMAGE_CACHE_DIR',
+    os.path.join(os.path.dirname(__file__), '../../../build/images')
+))
+
+# Covers 120px cards and the 650px content column at 1x and 2x
+IMAGE_WIDTHS = (160, 320, 480, 640, 960, 1280)
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+SOURCE_CACHE_MAX_ENTRIES = 1024
+# Best format first, so browsers pick the first <source> they support
+FORMATS = {
+    'avif': ('AVIF', 'image/avif', {'quality': 55}),
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 6}),
+}
+
+@dataclass(frozen=True)
+class ResponsiveImage:
+    width: int
+    height: int
+    # (mime type, srcset) per available format
+    sources: tuple[tuple[str, str], ...]
+
+@dataclass(frozen=True)
+class SourceInfo:
+    path: str
+    version: str
+    width: int
+    height: int
+
+class ImageService:
+    """
+    Resized WebP/AVIF derivatives of images under static/images.
+
+    Derivatives are generated on first request (or ahead of time with
+    generate_all) into an on-disk cache. Their names and URLs carry the
+    source's fingerprint, so they can be cached forever.
+    """
+
+    def __init__(self, static_dir: str = STATIC_DIR, cache_dir: str = IMAGE_CACHE_DIR):
+        self.static_dir = os.path.normpath(static_dir)
+        self.cache_dir = cache_dir
+        self.formats = [fmt for fmt in FORMATS if Image is not None and features.check(fmt)]
+        # Keyed on the file's mtime and size too, so a replaced image gets a new version
+        self._sources: LRUCache[tuple[str, int, int], SourceInfo] = LRUCache(SOURCE_CACHE_MAX_ENTRIES)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.formats)
+
+    def source(self, path: str) -> SourceInfo | None:
+        """Size and fingerprint of a static image, path relative to static/"""
+        if not (self.enabled and path.startswith('images/') and path.lower().endswith(SOURCE_EXTENSIONS)):
+            return None
+        full_path = os.path.normpath(os.path.join(self.static_dir, path))
+        if not full_path.startswith(self.static_dir + os.sep):
+            return None
+        # Misses are not cached, every made-up path would stay in memory otherwise
+        try:
+            file_stat = os.stat(full_path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(file_stat.st_mode):
+            return None
+        key = (path, file_stat.st_mtime_ns, file_stat.st_size)
+        info = self._sources.get(key)
+        if info is not None:
+            return info
+        version = hashlib.sha256(f'{file_stat.st_mtime_ns}:{file_stat.st_size}'.encode()).hexdigest()[:12]
+        with Image.open(full_path) as image:
+            width, height = image.size
+            # EXIF orientations 5-8 are rotated by 90 degrees
+            if image.getexif().get(0x0112) in (5, 6, 7, 8):
+                width, height = height, width
+        info = SourceInfo(path=path, version=version, width=width, height=height)
+        self._sources.put(key, info)
+        return info
+
+    @staticmethod
+    def widths_for(source: SourceInfo) -> list[int]:
+        """Standard widths below the source width, plus the source width itself"""
+        widths = [w for w in IMAGE_WIDTHS if w < source.width]
+        widths.append(min(source.width, IMAGE_WIDTHS[-1]))
+        return widths
+
+    @staticmethod
+    def derivative_url(source: SourceInfo, width: int, fmt: str) -> str:
+        stem = os.path.splitext(source.path.removeprefix('images/'))[0]
+        return f'/img/{width}/{stem}.{fmt}?v={source.version}'
+
+    def responsive(self, path: str) -> ResponsiveImage | None:
+        """srcset data for a static image, or None when derivatives are unavailable"""
+        source = self.source(path)
+        if source is None:
+            return None
+        widths = self.widths_for(source)
+        sources = tuple(
+            (FORMATS[fmt][1], ', '.join(f'{self.derivative_url(source, w, fmt)} {w}w' for w in widths))
+            for fmt in self.formats
+        )
+        return ResponsiveImage(width=source.width, height=source.height, sources=sources)
+
+    def find_source(self, stem: str) -> SourceInfo | None:
+        """Source image for a derivative path like posts/my-blog/cover"""
+        for ext in SOURCE_EXTENSIONS:
+            source = self.source(f'images/{stem}{ext}')
+            if source is not None:
+                return source
+        return None
+
+    def derivative(self, source: SourceInfo, width: int, fmt: str) -> str:
+        """Path of the resized image, generating it if it is not cached yet"""
+        if fmt not in self.formats or width not in self.widths_for(source):
+            raise ValueError(f'No {width}px {fmt} derivative for {source.path}')
+        stem = os.path.splitext(source.path)[0]
+        out_path = os.path.join(self.cache_dir, f'{stem}.{source.version}.{width}.{fmt}')
+        if os.path.isfile(out_path):
+            return out_path
+
+        pil_format, _, options = FORMATS[fmt]
+        with Image.open(os.path.join(self.static_dir, source.path)) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+            height = round(source.height * width / source.width)
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            # Unique temp name so concurrent first requests never see a partial file
+            tmp_path = f'{out_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            resized.save(tmp_path, pil_format, **options)
+        os.replace(tmp_path, out_path)
+        logger.info(f'Generated {out_path}')
+        return out_path
+
+    def generate_all(self, paths: list[str]) -> int:
+        """Pre-generate every derivative of the given static image paths"""
+        count = 0
+        for path in paths:
+            source = self.source(path)
+            if source is None:
+                continue
+            for fmt in self.formats:
+                for width in self.widths_for(source):
+                    self.derivative(source, width, fmt)
+                    count += 1
+        return count
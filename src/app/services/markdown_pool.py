@@ -0,0 +1,50 @@
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+import markdown
+from .highlight_cache import HighlightCache, HighlightExtension
+
+# HighlightExtension stands in for codehilite and fenced_code
+POST_EXTENSIONS = ['tables', 'toc']
+POST_CODEHILITE_CONFIG = {
+    'css_class': 'highlight',
+    'use_pygments': True,
+    'noclasses': False
+}
+
+# Home page fragments keep the default codehilite settings
+FRAGMENT_EXTENSIONS = ['tables']
+
+def create_post_markdown(highlight_cache: HighlightCache | None = None) -> markdown.Markdown:
+    return markdown.Markdown(extensions=[HighlightExtension(highlight_cache, **POST_CODEHILITE_CONFIG), *POST_EXTENSIONS])
+
+def create_fragment_markdown(highlight_cache: HighlightCache | None = None) -> markdown.Markdown:
+    return markdown.Markdown(extensions=[HighlightExtension(highlight_cache), *FRAGMENT_EXTENSIONS])
+
+class MarkdownPool:
+    """Pool of reusable Markdown converters, each used by one thread at a time"""
+
+    def __init__(self, factory: Callable[[], markdown.Markdown] = create_post_markdown, max_idle: int = 8):
+        self._factory = factory
+        self._max_idle = max_idle
+        self._idle: list[markdown.Markdown] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def checkout(self) -> Iterator[markdown.Markdown]:
+        with self._lock:
+            md = self._idle.pop() if self._idle else None
+        if md is None:
+            md = self._factory()
+        # Clear per-document state (toc, footnotes, ...) left by the previous user
+        md.reset()
+        try:
+            yield md
+        finally:
+            with self._lock:
+                if len(self._idle) < self._max_idle:
+                    self._idle.append(md)
+
+    def convert(self, text: str) -> str:
+        with self.checkout() as md:
+            return md.convert(text)
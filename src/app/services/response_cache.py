@@ -0,0 +1,128 @@
+import hashlib
+from collections.abc import Collection, Hashable
+from dataclasses import dataclass
+from datetime import date, datetime, time, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response
+from .cache import LRUCache
+
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Hosts whose pages are cached, overridden by ALLOWED_HOSTS
+RESPONSE_CACHE_HOSTS = ('emilpopovic.me', 'localhost', '127.0.0.1')
+# Every query parameter a cached page reads, anything else renders the same page
+RESPONSE_CACHE_PARAMS = ('after', 'page', 'search', 'tag')
+
+def to_datetime(last_modified: date | None) -> datetime | None:
+    """Dates become midnight UTC, as Last-Modified needs a time"""
+    if last_modified is not None and not isinstance(last_modified, datetime):
+        return datetime.combine(last_modified, time.min, tzinfo=timezone.utc)
+    return last_modified
+
+def is_known_host(request: Request, hosts: Collection[str]) -> bool:
+    """
+    Whether a request is for one of hosts on the default or the server's own
+    port, which bounds the base URLs pages are rendered and cached for.
+    """
+    url = request.url
+    server = request.scope.get('server')
+    return url.hostname in hosts and url.port in (None, server[1] if server else None)
+
+def latest(*values: date | None) -> datetime | None:
+    """The latest of some dates and datetimes, None if there are none"""
+    return max((to_datetime(value) for value in values if value is not None), default=None)
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """Validators of a cached response, answering conditional requests"""
+    etag: str
+    last_modified: datetime | None
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            'ETag': self.etag,
+            # Caches may store the page but must revalidate, which is a cheap 304
+            'Cache-Control': 'no-cache'
+        }
+        if self.last_modified is not None:
+            headers['Last-Modified'] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def is_fresh(self, request: Request) -> bool:
+        """Whether the client's conditional headers say it already has this page"""
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.1.3)
+            tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            return '*' in tags or self.etag in tags
+
+        if_modified_since = request.headers.get('if-modified-since')
+        if if_modified_since is not None and self.last_modified is not None:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+@dataclass(frozen=True)
+class CachedPage(CachedResponse):
+    body: bytes
+
+    @classmethod
+    def create(cls, body: bytes, last_modified: date | None = None) -> 'CachedPage':
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        return cls(body=body, etag=etag, last_modified=to_datetime(last_modified))
+
+    def to_response(self, request: Request) -> Response:
+        if self.is_fresh(request):
+            return Response(status_code=304, headers=self.headers())
+        return HTMLResponse(self.body, headers=self.headers())
+
+class ResponseCache:
+    """
+    Rendered pages keyed by content version, URL and query parameters.
+
+    Only the query parameters pages read and only known hosts are part of
+    the key, so junk parameters and spoofed Host headers can't flush the
+    cache with copies of the same pages.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        hosts: Collection[str] = RESPONSE_CACHE_HOSTS,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES
+    ):
+        self.hosts = frozenset(hosts)
+        self._pages: LRUCache[Hashable, CachedPage] = LRUCache(
+            max_entries,
+            max_weight=max_bytes,
+            weigh=lambda page: len(page.body)
+        )
+
+    def key(self, request: Request, version: Hashable) -> Hashable | None:
+        """Cache key of a GET, or None if its page must not be cached"""
+        # base_url is part of the key because url_for() renders absolute URLs,
+        # so it may only take a bounded set of values
+        if not is_known_host(request, self.hosts):
+            return None
+        params = request.query_params
+        return (
+            version,
+            str(request.base_url),
+            request.url.path,
+            # Routes read the last value of a repeated parameter
+            tuple((name, params[name]) for name in RESPONSE_CACHE_PARAMS if name in params)
+        )
+
+    def get(self, key: Hashable) -> CachedPage | None:
+        return self._pages.get(key)
+
+    def put(self, key: Hashable, page: CachedPage) -> None:
+        self._pages.put(key, page)
+
+    def clear(self) -> None:
+        self._pages.clear()
+
+    def stats(self) -> dict:
+        return self._pages.stats()
@@ -0,0 +1,132 @@
+import heapq
+import math
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from ..models import Post, PostRecord
+
+TOKEN_RE = re.compile(r'\w+')
+
+# BM25F-style field weights: a hit in the title is worth more than one in the body
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'tags': 2.5,
+    'description': 1.5,
+    'body': 1.0,
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Prefix expansions score lower than exact term matches
+PREFIX_PENALTY = 0.5
+MAX_PREFIX_EXPANSIONS = 64
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+@dataclass(frozen=True)
+class SearchHit:
+    post: PostRecord
+    score: float
+
+@dataclass(frozen=True)
+class SearchResult:
+    post: Post
+    score: float
+
+class SearchIndex:
+    """Inverted index over post titles, descriptions, tags and bodies, ranked with BM25"""
+
+    def __init__(self, posts: list[PostRecord], body_terms: dict[str, Counter]):
+        self._posts = posts
+        # term -> [(doc id, weighted term frequency)]
+        raw_postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        lengths = []
+        for doc_id, post in enumerate(posts):
+            weighted: dict[str, float] = defaultdict(float)
+            length = 0.0
+            fields = (
+                ('title', tokenize(post.title)),
+                ('tags', [t for tag in post.tags for t in tokenize(tag)]),
+                ('description', tokenize(post.description)),
+            )
+            for field, tokens in fields:
+                weight = FIELD_WEIGHTS[field]
+                for token in tokens:
+                    weighted[token] += weight
+                length += weight * len(tokens)
+            body = body_terms.get(post.slug)
+            if body:
+                weight = FIELD_WEIGHTS['body']
+                for term, count in body.items():
+                    weighted[term] += weight * count
+                length += weight * body.total()
+            for term, tf in weighted.items():
+                raw_postings[term].append((doc_id, tf))
+            lengths.append(length)
+
+        # Everything in BM25 except idf depends only on the document, so it is
+        # computed once here and queries just multiply and add
+        avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        norms = [BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length) if avg_length else BM25_K1 for length in lengths]
+        n = len(posts)
+        self._postings: dict[str, dict[int, float]] = {}
+        self._idf: dict[str, float] = {}
+        for term, entries in raw_postings.items():
+            self._postings[term] = {
+                doc_id: tf * (BM25_K1 + 1) / (tf + norms[doc_id])
+                for doc_id, tf in entries
+            }
+            df = len(entries)
+            self._idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        self._terms = sorted(self._postings)
+
+    def __len__(self) -> int:
+        return len(self._posts)
+
+    def _expand(self, token: str, prefix: bool) -> dict[str, float]:
+        """Map a query token to the index terms it matches and their score multiplier"""
+        matches = {}
+        if token in self._postings:
+            matches[token] = 1.0
+        if prefix:
+            i = bisect_left(self._terms, token)
+            while i < len(self._terms) and len(matches) < MAX_PREFIX_EXPANSIONS:
+                term = self._terms[i]
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, PREFIX_PENALTY)
+                i += 1
+        return matches
+
+    def _score_token(self, token: str, prefix: bool) -> dict[int, float]:
+        scores: dict[int, float] = {}
+        for term, multiplier in self._expand(token, prefix).items():
+            idf = self._idf[term] * multiplier
+            for doc_id, part in self._postings[term].items():
+                score = idf * part
+                # A token matched through several expansions counts its best one
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        return scores
+
+    def search(self, query: str, limit: int | None = 20, prefix: bool = True) -> list[SearchHit]:
+        """Return posts containing every query token, best match first"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._posts:
+            return []
+
+        # Rarest token first keeps the candidate set small
+        per_token = sorted((self._score_token(token, prefix) for token in tokens), key=len)
+        totals = dict(per_token[0])
+        for scores in per_token[1:]:
+            totals = {doc_id: total + scores[doc_id] for doc_id, total in totals.items() if doc_id in scores}
+            if not totals:
+                return []
+
+        key = lambda item: (-item[1], item[0])
+        if limit is None:
+            ranked = sorted(totals.items(), key=key)
+        else:
+            ranked = heapq.nsmallest(limit, totals.items(), key=key)
+        return [SearchHit(post=self._posts[doc_id], score=score) for doc_id, score in ranked]
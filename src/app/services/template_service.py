@@ -1,56 +1,94 @@
+from collections.abc import Callable, Hashable
+from datetime import date, datetime, timezone
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi import Request
-import os
+from jinja2 import pass_context
+from ..assets import AssetManifest
+from ..metrics import span
+from .icon_registry import IconRegistry
+from .image_service import ImageService
+from .response_cache import CachedPage, ResponseCache, latest
 
 class TemplateService:
-    def __init__(self, templates: Jinja2Templates):
+    def __init__(
+        self,
+        templates: Jinja2Templates,
+        response_cache: ResponseCache | None = None,
+        content_version: Callable[[], Hashable] | None = None,
+        icons: IconRegistry | None = None,
+        assets: AssetManifest | None = None,
+        images: ImageService | None = None
+    ):
         self.templates = templates
+        self.icons = icons or IconRegistry()
+        self.assets = assets
+        self.images = images
+        self.response_cache = response_cache
+        self.content_version = content_version or (lambda: 0)
+        # Deploys change templates, assets and code, so no page is older than this.
+        # Whole seconds, like the If-Modified-Since dates it is compared with.
+        self.started = datetime.now(timezone.utc).replace(microsecond=0)
         self._setup_template_functions()
 
     def _setup_template_functions(self):
         """Add custom functions to Jinja2 templates"""
-        self.templates.env.globals.update(load_svg=self._load_svg)
-
-    def _load_svg(self, filename):
-        """Load SVG file content and return as string with currentColor support"""
-        svg_path = os.path.join(os.path.dirname(__file__), f'../../../static/icons/{filename}.svg')
-        try:
-            with open(svg_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # Remove existing width/height attributes to allow CSS control
-            import re
-            content = re.sub(r'\s*width="[^"]*"', '', content)
-            content = re.sub(r'\s*height="[^"]*"', '', content)
-            
-            # Automatically convert common fill colors to currentColor
-            replacements = [
-                ('fill="#000"', 'fill="currentColor"'),
-                ('fill="#000000"', 'fill="currentColor"'),
-                ('fill="black"', 'fill="currentColor"'),
-                ('fill="#333"', 'fill="currentColor"'),
-                ('fill="#333333"', 'fill="currentColor"'),
-            ]
-            
-            for old, new in replacements:
-                content = content.replace(old, new)
-                
-            return content
-            
-        except FileNotFoundError:
-            return f'<!-- SVG not found: {filename} -->'
-        except Exception as e:
-            return f'<!-- Error loading {filename}: {e} -->'
-
-    def render(self, template_name, context, request: Request | None = None) -> HTMLResponse:
+        self.templates.env.globals.update(
+            load_svg=self.icons.get,
+            icon_sprite=self.icons.sprite,
+            responsive_image=self.images.responsive if self.images is not None else lambda _: None
+        )
+        if self.assets is not None and self.assets.enabled:
+            self.templates.env.globals.update(
+                url_for=self._asset_url_for,
+                css_bundle=self.assets.css_bundle
+            )
+
+    @pass_context
+    def _asset_url_for(self, context, name: str, /, **path_params):
+        """Drop-in url_for that points static paths at their fingerprinted build"""
+        if name == 'static' and 'path' in path_params:
+            path_params['path'] = self.assets.resolve(path_params['path'])  # pyright: ignore[reportOptionalMemberAccess]
+        return context['request'].url_for(name, **path_params)
+
+    def render(
+        self,
+        template_name,
+        context,
+        request: Request | None = None,
+        last_modified: date | None = None
+    ) -> Response:
+        """
+        Render a page, reusing the cached output for repeat GETs.
+
+        Cached pages carry a strong ETag, and conditional requests that match
+        are answered with 304. last_modified is the latest change of the
+        content shown, Last-Modified is never earlier than startup.
+        """
         ctx = dict(context)
         if request is not None:
             ctx.setdefault('request', request)
-        return self.templates.TemplateResponse(template_name, ctx)
 
-    def render_index(self, context, request: Request | None = None) -> HTMLResponse:
-        return self.render('index.html', context, request)
+        key = None
+        if request is not None and request.method == 'GET' and self.response_cache is not None:
+            key = self.response_cache.key(request, self.content_version())
+        if key is None:
+            with span('render.template'):
+                return self.templates.TemplateResponse(template_name, ctx)
+
+        page = self.response_cache.get(key)
+        if page is None:
+            with span('render.template'):
+                response = self.templates.TemplateResponse(template_name, ctx)
+            page = CachedPage.create(
+                bytes(response.body),
+                latest(last_modified, self.started) if last_modified is not None else None
+            )
+            self.response_cache.put(key, page)
+        return page.to_response(request)
+
+    def render_index(self, context, request: Request | None = None, last_modified: date | None = None) -> Response:
+        return self.render('index.html', context, request, last_modified)
 
-    def render_post(self, context, request: Request | None = None) -> HTMLResponse:
-        return self.render('post.html', context, request)
+    def render_post(self, context, request: Request | None = None, last_modified: date | None = None) -> Response:
+        return self.render('post.html', context, request, last_modified)
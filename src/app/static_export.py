@@ -0,0 +1,181 @@
+import asyncio
+import difflib
+import logging
+import os
+import shutil
+from collections.abc import Iterator
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit
+from starlette.responses import FileResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from .services.blog_service import BlogService
+
+logger = logging.getLogger(__name__)
+
+def iter_export_urls(blog_service: BlogService) -> Iterator[str]:
+    """Every GET page of the site that does not depend on user input"""
+    yield '/'
+    yield '/about'
+    yield '/contact'
+    yield '/blog'
+    for page in range(2, blog_service.list_posts().pages + 1):
+        yield '/blog?' + urlencode({'page': page})
+    for tag in blog_service.get_tags():
+        yield '/blog?' + urlencode({'tag': tag})
+        for page in range(2, blog_service.list_posts(tag=tag).pages + 1):
+            yield '/blog?' + urlencode({'tag': tag, 'page': page})
+    for post in blog_service.posts:
+        yield f'/blog/p/{post.slug}'
+    for series in blog_service.list_series():
+        yield f'/blog/s/{series.slug}'
+        for post in series.posts:
+            yield f'/blog/s/{series.slug}/p/{post.slug}'
+
+def export_file_for(path: str, query: list[tuple[str, str]]) -> str | None:
+    """
+    Relative file a page is exported to, or None if it is not pre-rendered.
+
+    Clean paths map to <path>/index.html. The only query strings that are
+    exported are the tag filter and page number of /blog.
+    """
+    path = path.strip('/')
+    if '..' in path.split('/'):
+        return None
+    if not query:
+        return os.path.join(path, 'index.html') if path else 'index.html'
+    params = dict(query)
+    if path != 'blog' or len(params) != len(query) or not set(params) <= {'tag', 'page'}:
+        return None
+    parts = ['blog']
+    if 'tag' in params:
+        if not params['tag']:
+            return None
+        parts += ['tags', quote(params['tag'], safe='')]
+    if 'page' in params:
+        if not params['page'].isdigit():
+            return None
+        parts += ['page', params['page']]
+    return os.path.join(*parts, 'index.html')
+
+async def fetch(app: ASGIApp, url: str, base_url: str) -> tuple[int, bytes]:
+    """Run a single GET through the ASGI app in-process"""
+    base = urlsplit(base_url)
+    target = urlsplit(url)
+    port = base.port or (443 if base.scheme == 'https' else 80)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': base.scheme,
+        'path': target.path,
+        'raw_path': target.path.encode(),
+        'query_string': target.query.encode(),
+        'root_path': '',
+        'headers': [(b'host', base.netloc.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': (base.hostname or 'localhost', port),
+    }
+    status = 500
+    body = bytearray()
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            body.extend(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return status, bytes(body)
+
+def export_site(app: ASGIApp, blog_service: BlogService, out_dir: str, base_url: str) -> int:
+    """
+    Pre-render every page into out_dir and return the number of pages.
+
+    Pages are written to a sibling directory first and swapped in at the
+    end, so a server reading out_dir never sees a partial export.
+    """
+    out_dir = os.path.abspath(out_dir)
+    staging_dir = out_dir + '.tmp'
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+    async def run() -> int:
+        count = 0
+        for url in iter_export_urls(blog_service):
+            target = urlsplit(url)
+            relative = export_file_for(target.path, parse_qsl(target.query))
+            if relative is None:
+                continue
+            status, body = await fetch(app, url, base_url)
+            if status != 200:
+                raise RuntimeError(f'{url} returned {status}')
+            path = os.path.join(staging_dir, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(body)
+            count += 1
+        return count
+
+    count = asyncio.run(run())
+
+    old_dir = out_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(staging_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return count
+
+def verify_export(app: ASGIApp, blog_service: BlogService, out_dir: str, base_url: str) -> list[str]:
+    """Re-render every page live and return unified diffs against the export"""
+
+    async def run() -> list[str]:
+        diffs = []
+        for url in iter_export_urls(blog_service):
+            target = urlsplit(url)
+            relative = export_file_for(target.path, parse_qsl(target.query))
+            if relative is None:
+                continue
+            path = os.path.join(out_dir, relative)
+            status, live = await fetch(app, url, base_url)
+            try:
+                with open(path, 'rb') as f:
+                    exported = f.read()
+            except FileNotFoundError:
+                diffs.append(f'{url}: missing {relative}')
+                continue
+            if status != 200:
+                diffs.append(f'{url}: live render returned {status}')
+            elif live != exported:
+                diffs.append(''.join(difflib.unified_diff(
+                    exported.decode().splitlines(keepends=True),
+                    live.decode().splitlines(keepends=True),
+                    fromfile=f'export/{relative}',
+                    tofile=f'live{url}'
+                )))
+        return diffs
+
+    return asyncio.run(run())
+
+class PrerenderedPages:
+    """ASGI middleware serving exported pages from disk, falling back to the app"""
+
+    def __init__(self, app: ASGIApp, directory: str):
+        self.app = app
+        self.directory = os.path.abspath(directory)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            query = parse_qsl(scope['query_string'].decode('latin-1'))
+            relative = export_file_for(scope['path'], query)
+            if relative is not None:
+                path = os.path.join(self.directory, relative)
+                if os.path.isfile(path):
+                    scope['prerendered'] = True
+                    response = FileResponse(path, media_type='text/html; charset=utf-8')
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
@@ -0,0 +1,148 @@
+import logging
+import os
+import time
+from collections.abc import Callable
+from starlette.types import ASGIApp
+from .assets import STATIC_DIR
+from .dependencies import (
+    get_asset_manifest,
+    get_blog_service,
+    get_fragment_service,
+    get_highlight_cache,
+    get_image_service,
+    get_template_service,
+    get_templates,
+)
+from .concurrency import run_io
+from .services.blog_service import RENDER_CACHE_MAX_ENTRIES
+from .services.highlight_cache import preload_lexers
+from .static_export import fetch
+
+logger = logging.getLogger(__name__)
+
+# Latest posts to pre-render alongside the index pages
+HOT_POSTS = int(os.getenv('WARMUP_HOT_POSTS', '5'))
+# Latest post bodies rendered before forking, never more than the render cache holds
+RENDER_POSTS = min(int(os.getenv('WARMUP_RENDER_POSTS', '50')), RENDER_CACHE_MAX_ENTRIES)
+# Part of the response cache key, so it should match what visitors use
+WARMUP_BASE_URL = os.getenv('WARMUP_BASE_URL', 'https://emilpopovic.me')
+# Pygments imports each lexer on first use, which snapshot-loaded posts never trigger
+WARMUP_LEXERS = os.getenv('WARMUP_LEXERS', 'python,yaml,html,css,javascript,json,bash,c,rust,text').split(',')
+
+class WarmUp:
+    """
+    Loads, validates and pre-renders everything ahead of the first visitor.
+
+    Stages that do not need an event loop run in run_sync, which the server
+    calls before forking workers; run finishes the rest inside each worker.
+    Stages that already ran are skipped, so their timings are kept.
+    """
+
+    def __init__(self, hot_posts: int = HOT_POSTS, render_posts: int = RENDER_POSTS, base_url: str = WARMUP_BASE_URL):
+        self.hot_posts = hot_posts
+        self.render_posts = render_posts
+        self.base_url = base_url
+        # stage -> milliseconds
+        self.timings: dict[str, float] = {}
+        self.problems: list[str] = []
+        self.error: str | None = None
+        self.ready = False
+
+    def _stage(self, name: str, func: Callable[[], None]) -> None:
+        if name in self.timings:
+            return
+        started = time.perf_counter()
+        func()
+        self.timings[name] = (time.perf_counter() - started) * 1000
+        logger.info(f'Warm-up stage {name} took {self.timings[name]:.1f}ms')
+
+    def _load_content(self) -> None:
+        blog_service = get_blog_service()
+        get_fragment_service()
+        self.problems.extend(blog_service.validate())
+        covers = [f'images/posts/{post.cover_image}' for post in blog_service.posts if post.cover_image]
+        covers += [f'images/series/{series.cover_image}' for series in blog_service.series if series.cover_image]
+        for path in covers:
+            if not os.path.isfile(os.path.join(STATIC_DIR, path)):
+                self.problems.append(f'Missing cover image {path}')
+
+    def _compile_templates(self) -> None:
+        templates = get_templates()
+        for name in templates.env.list_templates(extensions=['html']):
+            templates.env.get_template(name)
+
+    def _load_lexers(self) -> None:
+        get_highlight_cache()
+        preload_lexers([name for name in WARMUP_LEXERS if name])
+
+    def _render_posts(self) -> None:
+        # Only the newest posts, rendering all of them would take time proportional
+        # to the corpus just to have most evicted again. Also loads their lexers.
+        blog_service = get_blog_service()
+        for post in blog_service.get_latest_posts(limit=self.render_posts):
+            blog_service.render_post_body(post)
+
+    def _load_assets(self) -> None:
+        # The template service owns the icon registry
+        get_template_service()
+        get_asset_manifest()
+        image_service = get_image_service()
+        blog_service = get_blog_service()
+        for post in blog_service.posts:
+            if post.cover_image:
+                image_service.source(f'images/posts/{post.cover_image}')
+        for series in blog_service.series:
+            if series.cover_image:
+                image_service.source(f'images/series/{series.cover_image}')
+
+    def run_sync(self) -> None:
+        self._stage('content', self._load_content)
+        self._stage('templates', self._compile_templates)
+        self._stage('lexers', self._load_lexers)
+        self._stage('posts', self._render_posts)
+        self._stage('assets', self._load_assets)
+
+    def hot_urls(self) -> list[str]:
+        blog_service = get_blog_service()
+        urls = ['/', '/blog', '/about', '/contact']
+        urls += [f'/blog/p/{post.slug}' for post in blog_service.get_latest_posts(limit=self.hot_posts)]
+        urls += [f'/blog/s/{series.slug}' for series in blog_service.list_series()]
+        return urls
+
+    async def _render_pages(self, app: ASGIApp) -> None:
+        for url in self.hot_urls():
+            status, _ = await fetch(app, url, self.base_url)
+            if status != 200:
+                self.problems.append(f'{url} returned {status}')
+
+    async def run(self, app: ASGIApp) -> None:
+        """Run every stage, then mark the app ready unless one of them failed"""
+        try:
+            await run_io(self.run_sync)
+            started = time.perf_counter()
+            await self._render_pages(app)
+            self.timings['pages'] = (time.perf_counter() - started) * 1000
+            logger.info(f'Warm-up stage pages took {self.timings["pages"]:.1f}ms')
+        except Exception as e:
+            self.error = f'{type(e).__name__}: {e}'
+            logger.exception('Warm-up failed')
+            return
+        for problem in self.problems:
+            logger.warning(f'Content problem: {problem}')
+        self.ready = True
+        logger.info(f'Warm-up finished in {sum(self.timings.values()):.0f}ms')
+
+    def report(self) -> dict:
+        return {
+            'timings_ms': {name: round(ms, 1) for name, ms in self.timings.items()},
+            'problems': self.problems,
+            'error': self.error,
+        }
+
+_warm_up: WarmUp | None = None
+
+def get_warm_up() -> WarmUp:
+    global _warm_up
+    if _warm_up is None:
+        _warm_up = WarmUp()
+    return _warm_up
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+import argparse
+import os
+from app.assets import BUILD_DIR, STATIC_DIR, build_assets
+from app.dependencies import get_blog_service
+from app.services.image_service import ImageService
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Fingerprint, bundle and precompress static assets')
+    parser.add_argument('--static', default=STATIC_DIR, help='source static directory')
+    parser.add_argument('--out', default=BUILD_DIR, help='output directory')
+    parser.add_argument('--skip-images', action='store_true', help='do not pre-generate responsive images')
+    args = parser.parse_args()
+
+    manifest = build_assets(args.static, args.out)
+
+    source_size = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(args.static) for name in names
+    )
+    fonts = [path for path in manifest['files'] if path.endswith('.woff2')]
+    print(f'Built {len(manifest["files"])} assets into {args.out}')
+    print(f'{len(manifest["encodings"])} precompressed, {len(fonts)} fonts converted to WOFF2')
+    print(f'Source static directory: {source_size / 1024:.0f} KiB')
+
+    image_service = ImageService(static_dir=args.static)
+    if args.skip_images or not image_service.enabled:
+        return
+    blog_service = get_blog_service()
+    covers = [f'images/posts/{post.cover_image}' for post in blog_service.posts if post.cover_image]
+    covers += [f'images/series/{series.cover_image}' for series in blog_service.list_series() if series.cover_image]
+    count = image_service.generate_all(covers)
+    print(f'Generated {count} responsive image derivatives into {image_service.cache_dir}')
+
+if __name__ == '__main__':
+    main()
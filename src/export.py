@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+from run import load_environment
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Pre-render every page of the site into static HTML files')
+    parser.add_argument('--out', default='export', help='output directory (default: export)')
+    parser.add_argument('--base-url', default='https://emilpopovic.me', help='origin used for absolute links')
+    parser.add_argument('--verify', action='store_true', help='diff an existing export against live rendering instead of writing one')
+    args = parser.parse_args()
+
+    load_environment()
+    # Render through the real routes, never through a previous export
+    os.environ.pop('STATIC_EXPORT_DIR', None)
+
+    from app.main import create_app
+    from app.dependencies import get_blog_service
+    from app.static_export import export_site, verify_export
+
+    app = create_app()
+    blog_service = get_blog_service()
+
+    if args.verify:
+        diffs = verify_export(app, blog_service, args.out, args.base_url)
+        for diff in diffs:
+            print(diff)
+        print(f'{len(diffs)} page(s) differ from live rendering')
+        return 1 if diffs else 0
+
+    count = export_site(app, blog_service, args.out, args.base_url)
+    print(f'Exported {count} pages to {args.out}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
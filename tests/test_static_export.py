@@ -0,0 +1,100 @@
+import importlib
+import sys
+import os
+import pytest
+
+POST = '''---
+
+slug: "{slug}"
+file: "{slug}.md"
+title: "Post {number}"
+authors: ["Test Author"]
+created: "2024-01-{day:02d}"
+description: "Post number {number}"
+tags: [{tags}]
+draft: false
+featured: false
+
+---
+
+Paragraph with a [link](https://example.com) and `inline code`.
+
+```python
+def square(x):
+    return x * x
+```
+
+| a | b |
+|---|---|
+| 1 | 2 |
+'''
+
+SERIES = '''slug: "fixture-series"
+title: "Fixture Series"
+description: "A series of fixture posts"
+authors: ["Test Author"]
+created: "2024-01-01"
+status: ""
+cover_image: ""
+posts:
+  - slug: "post-01"
+    order: 1
+  - slug: "post-02"
+    order: 2
+'''
+
+BASE_URL = 'https://emilpopovic.me'
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+@pytest.fixture(scope='module')
+def site(tmp_path_factory):
+    """The app and blog service over a small corpus, with enough posts to paginate /blog"""
+    content = tmp_path_factory.mktemp('content')
+    for number in range(1, 24):
+        tags = '"python", "tech"' if number % 2 else '"tech"'
+        write(str(content / 'posts' / f'post-{number:02d}.md'), POST.format(slug=f'post-{number:02d}', number=number, day=number, tags=tags))
+    write(str(content / 'series' / 'fixture-series.yaml'), SERIES)
+    for name in ('hero', 'about', 'contact'):
+        write(str(content / 'home' / f'{name}.md'), f'# {name.title()}\n\nSome *{name}* text.\n')
+
+    with pytest.MonkeyPatch.context() as mp:
+        # Content paths are read when the services are imported
+        mp.setenv('CONTENT_DIR', str(content))
+        mp.setenv('CONTENT_SNAPSHOT', '')
+        mp.delenv('STATIC_EXPORT_DIR', raising=False)
+        mp.delenv('HIGHLIGHT_CACHE_DIR', raising=False)
+        mp.delenv('ALLOWED_HOSTS', raising=False)
+        for name in [name for name in list(sys.modules) if name == 'app' or name.startswith('app.')]:
+            mp.delitem(sys.modules, name)
+        main = importlib.import_module('app.main')
+        dependencies = importlib.import_module('app.dependencies')
+        static_export = importlib.import_module('app.static_export')
+        yield main.create_app(), dependencies.get_blog_service(), static_export
+
+def test_export_matches_live_rendering(site, tmp_path):
+    app, blog_service, static_export = site
+    out = str(tmp_path / 'export')
+
+    count = static_export.export_site(app, blog_service, out, BASE_URL)
+
+    assert count == len(list(static_export.iter_export_urls(blog_service)))
+    assert os.path.isfile(os.path.join(out, 'blog', 'page', '2', 'index.html'))
+    assert os.path.isfile(os.path.join(out, 'blog', 's', 'fixture-series', 'p', 'post-02', 'index.html'))
+    assert static_export.verify_export(app, blog_service, out, BASE_URL) == []
+
+def test_verify_reports_stale_pages(site, tmp_path):
+    app, blog_service, static_export = site
+    out = str(tmp_path / 'export')
+    static_export.export_site(app, blog_service, out, BASE_URL)
+
+    with open(os.path.join(out, 'about', 'index.html'), 'a') as f:
+        f.write('<!-- stale -->\n')
+    os.remove(os.path.join(out, 'blog', 'p', 'post-01', 'index.html'))
+
+    diffs = static_export.verify_export(app, blog_service, out, BASE_URL)
+    assert len(diffs) == 2
+    assert any(diff.startswith('/blog/p/post-01: missing') for diff in diffs)